@@ -0,0 +1,128 @@
+import multiprocessing
+import os
+import random
+import time
+from collections import deque
+from itertools import islice
+
+from ll1_parser import CFG
+
+class BatchStats:
+    """Counters filled in by parse_many; printable as a throughput report."""
+
+    def __init__(self):
+        self.items = 0
+        self.accepted = 0
+        self.tokens = 0
+        self.seconds = 0.0
+
+    @property
+    def items_per_second(self):
+        return self.items / self.seconds if self.seconds else 0.0
+
+    @property
+    def tokens_per_second(self):
+        return self.tokens / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f"{self.items} items ({self.accepted} accepted, {self.items - self.accepted} rejected), "
+                f"{self.tokens} tokens in {self.seconds:.3f}s: "
+                f"{self.items_per_second:,.0f} items/s, {self.tokens_per_second:,.0f} tokens/s")
+
+# Each worker process receives the compiled parser once, through the pool initializer
+_worker_parser = None
+
+def _init_worker(parser):
+    global _worker_parser
+    _worker_parser = parser
+
+def _parse_chunk(chunk):
+    parse = _worker_parser.parse
+    return [parse(item) for item in chunk]
+
+def _chunks(inputs, chunksize):
+    iterator = iter(inputs)
+    while True:
+        chunk = list(islice(iterator, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+def _token_count(item, result):
+    try:
+        return len(item)
+    except TypeError:
+        return result.position
+
+def parse_many(parser, inputs, processes=1, chunksize=512, stats=None, report=None):
+    """Lazily yield one ParseResult per input, in input order.
+
+    parser is a CompiledParser (a CFG is compiled first). With processes=1
+    everything runs in this process; otherwise a pool of that many workers
+    (None means os.cpu_count()) parses chunks of chunksize inputs, with only
+    a few chunks in flight at a time so the input is still streamed. When
+    the inputs are exhausted, stats (a BatchStats) is filled in and
+    report(stats) is called if given.
+    """
+    if isinstance(parser, CFG):
+        parser = parser.compile()
+    if stats is None:
+        stats = BatchStats()
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    started = time.perf_counter()
+    if processes == 1:
+        parse = parser.parse
+        for item in inputs:
+            result = parse(item)
+            stats.items += 1
+            stats.accepted += result.accepted
+            stats.tokens += _token_count(item, result)
+            yield result
+    else:
+        max_pending = processes * 4
+        with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(parser,)) as pool:
+            pending = deque()
+            chunks = _chunks(inputs, chunksize)
+            for chunk in chunks:
+                pending.append((chunk, pool.apply_async(_parse_chunk, (chunk,))))
+                if len(pending) >= max_pending:
+                    break
+            while pending:
+                chunk, async_result = pending.popleft()
+                for item, result in zip(chunk, async_result.get()):
+                    stats.items += 1
+                    stats.accepted += result.accepted
+                    stats.tokens += _token_count(item, result)
+                    yield result
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    pending.append((chunk, pool.apply_async(_parse_chunk, (chunk,))))
+
+    stats.seconds = time.perf_counter() - started
+    if report is not None:
+        report(stats)
+
+def main():
+    productions = {
+        'S': ['AB'],
+        'A': ['aA', 'ε'],
+        'B': ['b'],
+    }
+    cfg = CFG(productions, 'S')
+    cfg.calculate_first()
+    cfg.calculate_follow()
+    parser = cfg.compile()
+
+    rng = random.Random(0)
+    sentences = ['a' * rng.randrange(20) + rng.choice(['b', 'b', 'ab', 'ba']) for _ in range(200000)]
+
+    for processes in (1, None):
+        label = 'in-process' if processes == 1 else f'{os.cpu_count()} processes'
+        print(f"{label}:", end=' ')
+        for _ in parse_many(parser, sentences, processes=processes, report=print):
+            pass
+
+if __name__ == "__main__":
+    main()
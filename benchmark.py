@@ -0,0 +1,227 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from elimination_left_recur import eliminate_left_recursion_ir
+from grammar_ir import GrammarIR
+from grammar_simplify import simplify
+from left_factor import left_factor_ir
+from ll1_parser import CFG, CompiledParser
+
+def generate_grammar(non_terminals=20, alternatives=3, nullable=0.2, left_recursion_depth=1,
+                     prefix_length=2, terminals=None, max_body=4, seed=0):
+    """Random grammar as {head: [[symbol, ...], ...]} with start symbol 'N0'.
+
+    Non-terminals are N0..N<n-1> and terminals t0..t<k-1>. Bodies only refer
+    forward (to higher-numbered non-terminals), except for the planted
+    structure: a nullable fraction of the non-terminals get an ε body, chains
+    of left_recursion_depth non-terminals loop back to their first member
+    through the leftmost symbol (depth 1 is direct left recursion), and
+    pairs of alternatives share a common prefix of prefix_length symbols.
+    The first body of every non-terminal is terminal-only, so every
+    non-terminal derives some sentence.
+    """
+    rng = random.Random(seed)
+    names = [f"N{i}" for i in range(non_terminals)]
+    terminals = [f"t{i}" for i in range(terminals or max(4, non_terminals // 2))]
+    grammar = {}
+    for i, head in enumerate(names):
+        bodies = [[rng.choice(terminals) for _ in range(rng.randint(1, 2))]]
+        later = names[i + 1:]
+        while len(bodies) < alternatives:
+            body = []
+            for _ in range(rng.randint(1, max_body)):
+                if later and rng.random() < 0.4:
+                    body.append(rng.choice(later))
+                else:
+                    body.append(rng.choice(terminals))
+            bodies.append(body)
+        if prefix_length and alternatives > 1:
+            prefix = [rng.choice(terminals) for _ in range(prefix_length)]
+            for body in rng.sample(bodies[1:], min(2, len(bodies) - 1)):
+                body[:0] = prefix
+        if rng.random() < nullable:
+            bodies.append([])
+        grammar[head] = bodies
+
+    # Left-recursive cycles N_i -> N_i+1 ... -> N_i+d-1 -> N_i α over a quarter of the heads
+    depth = left_recursion_depth
+    if depth:
+        for first in range(0, non_terminals // 4 - depth + 1, depth):
+            cycle = names[first:first + depth]
+            for head, target in zip(cycle, cycle[1:] + cycle[:1]):
+                grammar[head].append([target, rng.choice(terminals)])
+    return grammar
+
+def _shortest(grammar):
+    # Length of the shortest sentence of each non-terminal, by fixpoint
+    shortest = {head: None for head in grammar}
+    changed = True
+    while changed:
+        changed = False
+        for head, bodies in grammar.items():
+            for body in bodies:
+                lengths = [shortest[s] if s in grammar else 1 for s in body]
+                if None in lengths:
+                    continue
+                if shortest[head] is None or sum(lengths) < shortest[head]:
+                    shortest[head] = sum(lengths)
+                    changed = True
+    return shortest
+
+def generate_sentences(grammar, start, count, max_depth=12, seed=0):
+    """count random sentences of the grammar, as token lists.
+
+    Derivations choose alternatives at random and switch to the shortest
+    alternative below max_depth, so they always terminate.
+    """
+    rng = random.Random(seed)
+    shortest = _shortest(grammar)
+    cheapest = {head: min((b for b in bodies if None not in
+                           [shortest.get(s, 1) for s in b]),
+                          key=lambda b: sum(shortest.get(s, 1) for s in b))
+                for head, bodies in grammar.items()}
+    sentences = []
+    for _ in range(count):
+        sentence = []
+        stack = [(start, 0)]
+        while stack:
+            symbol, depth = stack.pop()
+            if symbol not in grammar:
+                sentence.append(symbol)
+                continue
+            body = rng.choice(grammar[symbol]) if depth < max_depth else cheapest[symbol]
+            stack.extend((s, depth + 1) for s in reversed(body))
+        sentences.append(sentence)
+    return sentences
+
+def corrupt(sentences, terminals, seed=0):
+    """Copies with one token deleted, inserted or replaced; mostly invalid sentences."""
+    rng = random.Random(seed)
+    result = []
+    for sentence in sentences:
+        sentence = list(sentence)
+        position = rng.randint(0, len(sentence))
+        edit = rng.randrange(3)
+        if edit == 0 and sentence:
+            del sentence[min(position, len(sentence) - 1)]
+        elif edit == 1 or not sentence:
+            sentence.insert(position, rng.choice(terminals))
+        else:
+            sentence[min(position, len(sentence) - 1)] = rng.choice(terminals)
+        result.append(sentence)
+    return result
+
+def _timed(stages, name, function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    stages[name] = time.perf_counter() - started
+    return result
+
+def run(non_terminals=20, alternatives=3, nullable=0.2, left_recursion_depth=1, prefix_length=2,
+        sentences=1000, seed=0):
+    """Generate one grammar and its inputs, run every stage once, return a result dict."""
+    parameters = {
+        'non_terminals': non_terminals,
+        'alternatives': alternatives,
+        'nullable': nullable,
+        'left_recursion_depth': left_recursion_depth,
+        'prefix_length': prefix_length,
+        'sentences': sentences,
+        'seed': seed,
+    }
+    productions = generate_grammar(non_terminals, alternatives, nullable, left_recursion_depth,
+                                   prefix_length, seed=seed)
+    valid = generate_sentences(productions, 'N0', sentences, seed=seed)
+    terminals = sorted({s for bodies in productions.values() for b in bodies for s in b
+                        if s not in productions})
+    invalid = corrupt(valid, terminals, seed=seed)
+
+    stages = {}
+    grammar = GrammarIR.from_dict(productions, 'N0', is_non_terminal=productions.__contains__)
+    rules_before = len(grammar)
+    # Timed on its own: later stages keep the generated size, unreachable parts included
+    simplified = _timed(stages, 'simplify', simplify, grammar, None, False)
+    grammar = _timed(stages, 'extract_left_factoring', left_factor_ir, grammar)
+    grammar = _timed(stages, 'eliminate_left_recursion', eliminate_left_recursion_ir, grammar)
+    cfg = CFG(grammar.to_dict(), grammar.symbols.names[grammar.start])
+    _timed(stages, 'calculate_first', cfg.calculate_first)
+    _timed(stages, 'calculate_follow', cfg.calculate_follow)
+    table = _timed(stages, 'build_parsing_table', cfg.build_parsing_table)
+    parser = _timed(stages, 'compile', CompiledParser.from_cfg, cfg, table)
+
+    parse = parser.parse
+    parsing = {}
+    for label, inputs in (('valid', valid), ('invalid', invalid)):
+        started = time.perf_counter()
+        accepted = sum(1 for tokens in inputs if parse(tokens))
+        seconds = time.perf_counter() - started
+        tokens = sum(len(tokens) for tokens in inputs)
+        parsing[label] = {
+            'sentences': len(inputs),
+            'tokens': tokens,
+            'accepted': accepted,
+            'seconds': seconds,
+            'tokens_per_second': tokens / seconds if seconds else None,
+        }
+    stages['parse'] = parsing['valid']['seconds'] + parsing['invalid']['seconds']
+
+    return {
+        'parameters': parameters,
+        'grammar': {
+            'rules_before': rules_before,
+            'rules_simplified': len(simplified),
+            'non_terminals_simplified': len(simplified.rules),
+            'rules_after': len(grammar),
+            'non_terminals_after': len(grammar.rules),
+            'terminals': len(parser.symbols[:parser.num_terminals]) - 1,
+            'conflicts': len(cfg.conflicts),
+        },
+        'stages': stages,
+        'parse': parsing,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time every stage of the LL(1) pipeline on "
+                                                 "synthetic grammars and write JSON results.")
+    parser.add_argument('--non-terminals', type=int, nargs='+', default=[10, 100, 1000],
+                        help="grammar sizes; one run per value, for scaling curves")
+    parser.add_argument('--alternatives', type=int, default=3)
+    parser.add_argument('--nullable', type=float, default=0.2,
+                        help="fraction of non-terminals with an ε alternative")
+    parser.add_argument('--left-recursion-depth', type=int, default=1,
+                        help="length of planted left-recursive cycles (0 for none)")
+    parser.add_argument('--prefix-length', type=int, default=2,
+                        help="length of planted common prefixes (0 for none)")
+    parser.add_argument('--sentences', type=int, default=1000,
+                        help="valid sentences per grammar, plus as many corrupted ones")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', '-o', help="JSON file to write (default: stdout)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in args.non_terminals:
+        result = run(size, args.alternatives, args.nullable, args.left_recursion_depth,
+                     args.prefix_length, args.sentences, args.seed)
+        results.append(result)
+        stages = ', '.join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in result['stages'].items())
+        print(f"{size} non-terminals: {stages}", file=sys.stderr)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,21 @@
 import sys
 import re
+import time
 from collections import defaultdict, OrderedDict
 
+import instrumentation
+from grammar_analysis import strongly_connected_components
+from grammar_ir import GrammarIR
+from grammar_loader import GrammarError, load_grammar_lines
+
 class Grammar:
-    def __init__(self):
+    SYMBOL_PATTERN = re.compile(r"[A-Z]'*|[a-z]+|\S")
+
+    def __init__(self, symbol_pattern=SYMBOL_PATTERN):
         self.productions = OrderedDict()  # 保持插入顺序
         self.nonterminals = []
         self.terminals = set()
+        self.symbol_pattern = symbol_pattern
     
     def add_production(self, nonterminal, productions):
         if nonterminal not in self.productions:
@@ -17,58 +26,25 @@ class Grammar:
             self.productions[nonterminal].append(symbols)
     
     def parse_production(self, prod_str):
-        # 分割产生式为符号列表
-        # 这里假设符号之间没有空格，可以根据需要调整
-        tokens = re.findall(r"[A-Za-z']+|[\(\)\+\*\|ε]", prod_str)
-        return tokens
+        # 分割产生式为符号列表：大写字母连同其后的 ' 为非终结符，连续小写字母
+        # （如 id）为一个终结符，其余每个非空白字符各为一个符号，不再丢弃未知字符
+        return self.symbol_pattern.findall(prod_str)
     
     def get_nonterminals_set(self):
         return set(self.nonterminals)
     
-    def eliminate_left_recursion(self):
-        new_productions = OrderedDict()
-        nonterminals = self.nonterminals.copy()
-        for i, Ai in enumerate(nonterminals):
-            # 替换间接左递归
-            for j in range(i):
-                Aj = nonterminals[j]
-                new_rules = []
-                for production in self.productions[Ai]:
-                    if production[0] == Aj:
-                        # 替换 Aj 的产生式
-                        for delta in new_productions[Aj]:
-                            new_rule = delta + production[1:]
-                            new_rules.append(new_rule)
-                    else:
-                        new_rules.append(production)
-                self.productions[Ai] = new_rules
-            # 消除直接左递归
-            self.remove_direct_left_recursion(Ai, new_productions)
-        self.productions = new_productions
-    
-    def remove_direct_left_recursion(self, Ai, new_productions):
-        alpha = []  # 直接左递归的产生式
-        beta = []   # 非左递归的产生式
-        for production in self.productions[Ai]:
-            if production[0] == Ai:
-                alpha.append(production[1:])
-            else:
-                beta.append(production)
-        if alpha:
-            # 存在直接左递归
-            Ai_prime = Ai + "'"
-            while Ai_prime in self.productions or Ai_prime in new_productions:
-                Ai_prime += "'"
-            self.nonterminals.append(Ai_prime)
-            new_productions[Ai] = []
-            for b in beta:
-                new_productions[Ai].append(b + [Ai_prime])
-            new_productions[Ai_prime] = []
-            for a in alpha:
-                new_productions[Ai_prime].append(a + [Ai_prime])
-            new_productions[Ai_prime].append(['ε'])
-        else:
-            new_productions[Ai] = self.productions[Ai]
+    def eliminate_left_recursion(self, report=None):
+        # 转换为 GrammarIR 后消除左递归，再写回符号列表形式
+        heads = set(self.productions)
+        grammar = GrammarIR.from_dict(self.productions, self.nonterminals[0],
+                                      is_non_terminal=heads.__contains__)
+        grammar = eliminate_left_recursion_ir(grammar, report)
+        names = grammar.symbols.names
+        self.productions = OrderedDict(
+            (names[head], [[names[s] for s in body] or ['ε'] for body in bodies])
+            for head, bodies in grammar.rules.items()
+        )
+        self.nonterminals = list(self.productions)
     
     def get_all_terminals(self):
         nonterminals_set = self.get_nonterminals_set()
@@ -98,6 +74,289 @@ class Grammar:
             rhs = ' | '.join(prod_dict[lhs])
             print(f"{lhs} -> {rhs}")
 
+class EliminationReport:
+    """消除左递归过程中的文法规模统计"""
+
+    def __init__(self):
+        self.rules_before = 0
+        self.rules_after = 0
+        self.non_terminals_before = 0
+        self.non_terminals_after = 0
+        self.epsilon_removed = 0
+        self.unit_cycles = 0
+        self.substitutions = 0
+        self.seconds = 0.0
+
+    @property
+    def growth(self):
+        return self.rules_after / self.rules_before if self.rules_before else 1.0
+
+    def __str__(self):
+        return (f"rules {self.rules_before} -> {self.rules_after} (x{self.growth:.2f}), "
+                f"non-terminals {self.non_terminals_before} -> {self.non_terminals_after}, "
+                f"ε-productions removed {self.epsilon_removed}, unit cycles collapsed {self.unit_cycles}, "
+                f"substitutions {self.substitutions}, {self.seconds:.3f}s")
+
+def nullable_non_terminals(grammar):
+    """可空非终结符集合：计数工作表，产生式右部全部可空时其左部可空"""
+    rules = grammar.rules
+    is_non_terminal = grammar.symbols.non_terminal
+    nullable = set()
+    worklist = []
+    occurrences = defaultdict(list)
+    for head, bodies in rules.items():
+        for body in bodies:
+            if not all(is_non_terminal[s] for s in body):
+                continue
+            if not body:
+                if head not in nullable:
+                    nullable.add(head)
+                    worklist.append(head)
+                continue
+            entry = [len(body), head]
+            for symbol in body:
+                occurrences[symbol].append(entry)
+    while worklist:
+        for entry in occurrences[worklist.pop()]:
+            entry[0] -= 1
+            if entry[0] == 0 and entry[1] not in nullable:
+                nullable.add(entry[1])
+                worklist.append(entry[1])
+    return nullable
+
+def needs_preprocessing(grammar):
+    """判断是否存在隐藏的左递归或单产生式环，只有这时才需要先消除 ε 产生式和单产生式环
+
+    左角依赖图考虑可空前缀：A -> X1 ... Xn 中，X1..Xi-1 全部可空时 A 依赖 Xi。
+    在同一个强连通分量内，若某条边经过可空前缀（隐藏左递归），或边之后的
+    剩余部分全部可空（A =>+ A 的单产生式环），代入法就无法消除它；否则直接
+    对原文法代入即可，不必改动其余（可能是 LL(1) 的）部分。
+    """
+    rules = grammar.rules
+    is_non_terminal = grammar.symbols.non_terminal
+    nullable = nullable_non_terminals(grammar)
+    heads = list(rules)
+    index = {head: i for i, head in enumerate(heads)}
+    successors = [[] for _ in heads]
+    edges = []
+    for head, bodies in rules.items():
+        for body in bodies:
+            for i, symbol in enumerate(body):
+                if not is_non_terminal[symbol]:
+                    break
+                if symbol in index:
+                    successors[index[head]].append(index[symbol])
+                    rest_nullable = all(s in nullable for s in body[i + 1:])
+                    edges.append((head, symbol, i > 0 or rest_nullable))
+                if symbol not in nullable:
+                    break
+
+    component_of = {}
+    for number, component in enumerate(strongly_connected_components(successors)):
+        for member in component:
+            component_of[heads[member]] = number
+    return any(hard and component_of[head] == component_of[symbol]
+               for head, symbol, hard in edges)
+
+def remove_epsilon_productions(grammar, report=None, max_rules=None):
+    """消除 ε 产生式；若开始符号可空，则保留（或引入新的开始符号承载）S -> ε
+
+    含 k 个可空符号的右部展开为至多 2^k 个变体；max_rules 不为 None 时，
+    在生成变体的过程中一旦产生式总数超过它就抛出 ValueError。
+    """
+    rules = grammar.rules
+    is_non_terminal = grammar.symbols.non_terminal
+    nullable = nullable_non_terminals(grammar)
+    worklist = []
+
+    # 能推出非空串的非终结符；只能推出 ε 的符号直接从右部删去
+    nonempty = set()
+    users = defaultdict(set)
+    for head, bodies in rules.items():
+        for body in bodies:
+            for symbol in body:
+                if not is_non_terminal[symbol]:
+                    if head not in nonempty:
+                        nonempty.add(head)
+                        worklist.append(head)
+                else:
+                    users[symbol].add(head)
+    while worklist:
+        for head in users[worklist.pop()]:
+            if head not in nonempty:
+                nonempty.add(head)
+                worklist.append(head)
+
+    symbols = grammar.symbols.copy()
+    new_rules = {}
+    removed = 0
+    # 已生成的产生式数（含当前左部已收集的变体）
+    produced = 0
+    for head, bodies in rules.items():
+        variants = {}
+        for body in bodies:
+            if not body:
+                removed += 1
+                continue
+            if not any(symbol in nullable for symbol in body):
+                variants[body] = None
+                continue
+            # 每个可空符号分别保留或删去，完整右部排在最前
+            current = [()]
+            for symbol in body:
+                if symbol not in nullable:
+                    current = [variant + (symbol,) for variant in current]
+                elif symbol in nonempty:
+                    # 去重后再检查规模：每步至多翻倍，超限时立即停止
+                    current = list(dict.fromkeys(
+                        [variant + (symbol,) for variant in current] + current))
+                    if max_rules is not None and produced + len(variants) + len(current) > max_rules:
+                        raise ValueError(f"ε-production removal exceeded {max_rules} rules "
+                                         f"while expanding {symbols.names[head]}")
+            for variant in current:
+                if variant and variant != (head,):
+                    variants[variant] = None
+        if variants or head == grammar.start:
+            new_rules[head] = list(variants)
+        produced += len(variants)
+
+    start = grammar.start
+    if start in nullable:
+        if any(start in body for bodies in new_rules.values() for body in bodies):
+            new_start = symbols.fresh(start)
+            new_rules = {new_start: [(start,), ()], **new_rules}
+            start = new_start
+        else:
+            new_rules[start].append(())
+    if report is not None:
+        report.epsilon_removed += removed
+    return GrammarIR(symbols, start, new_rules)
+
+def remove_unit_cycles(grammar, report=None):
+    """把单产生式环 A -> B -> ... -> A 上的非终结符合并为一个"""
+    heads = list(grammar.rules)
+    index = {head: i for i, head in enumerate(heads)}
+    is_non_terminal = grammar.symbols.non_terminal
+    successors = [[] for _ in heads]
+    for head, bodies in grammar.rules.items():
+        for body in bodies:
+            if len(body) == 1 and is_non_terminal[body[0]] and body[0] in index:
+                successors[index[head]].append(index[body[0]])
+
+    representative = {}
+    for component in strongly_connected_components(successors):
+        if len(component) > 1:
+            keep = heads[min(component)]
+            for member in component:
+                if heads[member] != keep:
+                    representative[heads[member]] = keep
+            if report is not None:
+                report.unit_cycles += 1
+
+    new_rules = {}
+    for head, bodies in grammar.rules.items():
+        target = representative.get(head, head)
+        merged = new_rules.setdefault(target, {})
+        for body in bodies:
+            if representative and any(symbol in representative for symbol in body):
+                body = tuple(representative.get(symbol, symbol) for symbol in body)
+            if body != (target,):
+                merged[body] = None
+    return GrammarIR(grammar.symbols.copy(), representative.get(grammar.start, grammar.start),
+                     {head: list(bodies) for head, bodies in new_rules.items()})
+
+def eliminate_left_recursion_ir(grammar, report=None, max_rules=1000000):
+    """在 GrammarIR 上消除左递归，返回新的 GrammarIR
+
+    只有存在隐藏左递归或单产生式环时（见 needs_preprocessing）才先消除 ε
+    产生式和单产生式环，其余文法保持原样，以免把 LL(1) 文法变成非 LL(1)；
+    再按左角（右部首符号）依赖图的强连通分量
+    排序：分量按拓扑序排列、被依赖者在后，因此只有同一分量内（真正相互左
+    递归）的非终结符之间需要代入；分量内候选式少的非终结符排在前面，使被
+    代入的展开尽量小。代入结果直接拼接共享的符号元组。
+    report（EliminationReport）若给出，则记录文法规模的变化；产生式总数超过
+    max_rules 时抛出 ValueError，而不是无限制地膨胀。
+    """
+    started = time.perf_counter()
+    if report is not None:
+        report.rules_before = len(grammar)
+        report.non_terminals_before = len(grammar.rules)
+    if needs_preprocessing(grammar):
+        grammar = remove_epsilon_productions(grammar, report, max_rules)
+        grammar = remove_unit_cycles(grammar, report)
+    symbols = grammar.symbols.copy()
+    rules = grammar.rules
+
+    # 左角依赖图：A -> B... 则 A 依赖 B
+    heads = list(rules)
+    index = {head: i for i, head in enumerate(heads)}
+    successors = [[] for _ in heads]
+    for head, bodies in rules.items():
+        corners = {body[0] for body in bodies if body and body[0] in index}
+        successors[index[head]] = [index[corner] for corner in corners]
+
+    component_of = {}
+    order = []
+    for number, component in enumerate(reversed(strongly_connected_components(successors))):
+        for member in sorted(component, key=lambda m: (len(rules[heads[m]]), m)):
+            component_of[heads[member]] = number
+            order.append(heads[member])
+    position = {head: i for i, head in enumerate(order)}
+
+    new_rules = {}
+    primes = {}
+    substitutions = 0
+    total = len(grammar)
+    for Ai in order:
+        bodies = rules[Ai]
+        component = component_of[Ai]
+        # 替换间接左递归：只代入同一分量中排在前面的非终结符
+        if any(body and component_of.get(body[0]) == component and position[body[0]] < position[Ai]
+               for body in bodies):
+            result = []
+            stack = list(reversed(bodies))
+            while stack:
+                body = stack.pop()
+                first = body[0] if body else None
+                if component_of.get(first) == component and position[first] < position[Ai]:
+                    tail = body[1:]
+                    substitutions += 1
+                    total += len(new_rules[first]) - 1
+                    if max_rules is not None and total > max_rules:
+                        raise ValueError(f"left-recursion elimination exceeded {max_rules} rules "
+                                         f"while substituting into {symbols.names[Ai]}")
+                    stack.extend(reversed([delta + tail for delta in new_rules[first]]))
+                else:
+                    result.append(body)
+            bodies = result
+        # 消除直接左递归
+        alpha = [body[1:] for body in bodies if body and body[0] == Ai]
+        if alpha:
+            Ai_prime = symbols.fresh(Ai)
+            primes[Ai] = Ai_prime
+            new_rules[Ai] = [body + (Ai_prime,) for body in bodies if not body or body[0] != Ai]
+            new_rules[Ai_prime] = [a + (Ai_prime,) for a in alpha] + [()]
+        else:
+            new_rules[Ai] = bodies
+
+    # 输出保持原有的非终结符顺序，新符号紧跟在其来源之后
+    ordered = {}
+    for head in heads:
+        ordered[head] = new_rules[head]
+        if head in primes:
+            ordered[primes[head]] = new_rules[primes[head]]
+    result = GrammarIR(symbols, grammar.start, ordered)
+    if report is not None:
+        report.substitutions += substitutions
+        report.rules_after = len(result)
+        report.non_terminals_after = len(result.rules)
+        report.seconds = time.perf_counter() - started
+    if instrumentation.hook is not None:
+        instrumentation.observe('left_recursion.seconds', time.perf_counter() - started)
+        instrumentation.count('left_recursion.substitutions', substitutions)
+        instrumentation.observe('left_recursion.rules', len(result))
+    return result
+
 def convert_grammar_format(productions):
     """转换文法格式，用于其他模块调用"""
     grammar = Grammar()
@@ -107,24 +366,17 @@ def convert_grammar_format(productions):
 
 def main():
     grammar = Grammar()
-    lines = []
-    for line in sys.stdin:
-        line = line.strip()
-        if line:
-            lines.append(line)
-    # 假设生产规则从第四行开始（根据样例输入）
-    # 找出所有产生式
-    production_lines = []
-    for line in lines:
-        if '->' in line:
-            production_lines.append(line)
+    # 样例输入的前几行不是产生式，只把含 -> 的行逐行交给 grammar_loader
+    try:
+        ir = load_grammar_lines((line for line in sys.stdin if '->' in line),
+                                pattern=Grammar.SYMBOL_PATTERN, validate=False, source='<stdin>')
+    except GrammarError as error:
+        print(f"error: {error}", file=sys.stderr)
+        sys.exit(1)
     # 添加产生式到文法
-    for prod_line in production_lines:
-        lhs, rhs = prod_line.split('->')
-        lhs = lhs.strip()
-        rhs = rhs.strip()
-        alternatives = [alt.strip() for alt in rhs.split('|')]
-        grammar.add_production(lhs, alternatives)
+    for lhs, bodies in ir.to_dict().items():
+        grammar.productions[lhs] = bodies
+        grammar.nonterminals.append(lhs)
     # 消除左递归
     grammar.eliminate_left_recursion()
     # 获取终结符
@@ -0,0 +1,101 @@
+from types import MappingProxyType
+
+from grammar_analysis import EPSILON
+
+class FrozenGrammar:
+    """Analyzed, compiled grammar that never changes once built.
+
+    Productions, FIRST and FOLLOW sets are read-only mappings of tuples and
+    frozensets, conflicts is a tuple, and parser is the CompiledParser.
+    Everything is computed up front and nothing is memoized afterwards, so
+    any number of threads may share one instance without locks; the only
+    mutable state of a parse is the stack of a parse() call or of the
+    ParseSession that session() returns.
+    """
+
+    __slots__ = ('start_symbol', 'productions', 'nullable', 'first_sets', 'follow_sets',
+                 'conflicts', 'parser')
+
+    def __init__(self, start_symbol, productions, first_sets, follow_sets, parser, conflicts=()):
+        setter = object.__setattr__
+        setter(self, 'start_symbol', start_symbol)
+        setter(self, 'productions', MappingProxyType({
+            head: tuple(body if isinstance(body, str) else tuple(body) for body in bodies)
+            for head, bodies in productions.items()
+        }))
+        setter(self, 'first_sets', MappingProxyType(
+            {nt: frozenset(first) for nt, first in first_sets.items()}))
+        setter(self, 'follow_sets', MappingProxyType(
+            {nt: frozenset(follow) for nt, follow in follow_sets.items()}))
+        setter(self, 'nullable', frozenset(nt for nt, first in first_sets.items() if EPSILON in first))
+        setter(self, 'conflicts', tuple(conflicts))
+        setter(self, 'parser', parser)
+
+    @classmethod
+    def from_cfg(cls, cfg, strict=False, layout=None):
+        """Analyze and compile cfg, then snapshot the results."""
+        parser = cfg.compile(strict, layout)
+        return cls(cfg.start_symbol, cfg.productions, cfg.first_sets, cfg.follow_sets,
+                   parser, cfg.conflicts)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return (FrozenGrammar, (self.start_symbol, dict(self.productions), dict(self.first_sets),
+                                dict(self.follow_sets), self.parser, self.conflicts))
+
+    def first(self, symbols):
+        """FIRST of a symbol sequence, with 'ε' if the whole sequence can vanish."""
+        result = set()
+        for symbol in symbols:
+            if symbol == EPSILON:
+                continue
+            first = self.first_sets.get(symbol)
+            if first is None:
+                result.add(symbol)
+                return frozenset(result)
+            result |= first - {EPSILON}
+            if symbol not in self.nullable:
+                return frozenset(result)
+        result.add(EPSILON)
+        return frozenset(result)
+
+    def follow(self, non_terminal):
+        return self.follow_sets[non_terminal]
+
+    def parse(self, tokens, trace=None, build_tree=False, recover=False, **limits):
+        """Parse with the compiled table; see CompiledParser.parse."""
+        return self.parser.parse(tokens, trace, build_tree, recover, **limits)
+
+    def session(self, lexer=None, trace=None):
+        """A new ParseSession; each concurrent request should use its own."""
+        return self.parser.session(lexer, trace)
+
+def main():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from ll1_parser import CFG
+
+    grammar = CFG({
+        'E': ['TX'],
+        'X': ['+TX', 'ε'],
+        'T': ['FY'],
+        'Y': ['*FY', 'ε'],
+        'F': ['(E)', 'i'],
+    }, 'E').freeze()
+    print(f"FIRST(TX) = {sorted(grammar.first('TX'))}, FOLLOW(T) = {sorted(grammar.follow('T'))}")
+
+    # One shared grammar, many threads, no locks
+    inputs = ['i+i*i', '(i+i)*i', 'i+*i', '((i))', 'i)'] * 2000
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(grammar.parse, inputs))
+    accepted = sum(1 for result in results if result)
+    print(f"{len(results)} inputs parsed on 8 threads: {accepted} accepted, "
+          f"{len(results) - accepted} rejected")
+
+if __name__ == "__main__":
+    main()
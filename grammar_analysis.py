@@ -0,0 +1,368 @@
+import instrumentation
+
+EPSILON = 'ε'
+END_MARKER = '$'
+
+def strongly_connected_components(successors):
+    """Tarjan's algorithm without recursion.
+
+    successors[u] lists the nodes u depends on. Components are returned
+    dependencies-first, so each one can be finished in a single visit.
+    """
+    count = len(successors)
+    index = [-1] * count
+    low = [0] * count
+    on_stack = [False] * count
+    stack = []
+    components = []
+    counter = 0
+
+    for root in range(count):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, 0)]
+        while work:
+            node, i = work[-1]
+            edges = successors[node]
+            if i < len(edges):
+                work[-1] = (node, i + 1)
+                target = edges[i]
+                if index[target] == -1:
+                    index[target] = low[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack[target] = True
+                    work.append((target, 0))
+                elif on_stack[target] and index[target] < low[node]:
+                    low[node] = index[target]
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if low[node] < low[parent]:
+                        low[parent] = low[node]
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+def _component_metrics(stage, components, successors):
+    # Each component is solved in one visit, so the work is the number of
+    # components and edges; depth is the longest chain of dependent components
+    # (what used to be the recursion depth of get_first)
+    component_of = [0] * len(successors)
+    depth = []
+    for number, component in enumerate(components):
+        longest = 0
+        for member in component:
+            component_of[member] = number
+        for member in component:
+            for dependency in successors[member]:
+                other = component_of[dependency]
+                if other != number and depth[other] > longest:
+                    longest = depth[other]
+        depth.append(longest + 1)
+    instrumentation.count(f'{stage}.components', len(components))
+    instrumentation.count(f'{stage}.edges', sum(len(edges) for edges in successors))
+    instrumentation.observe(f'{stage}.largest_component', max(map(len, components), default=0))
+    instrumentation.observe(f'{stage}.depth', max(depth, default=0))
+
+class GrammarAnalysis:
+    """FIRST, FOLLOW and nullable sets computed without recursion or rescans.
+
+    The grammar is interned once: non-terminal k is encoded as k and
+    terminal j as -(j + 1). Nullable uses a counting worklist; FIRST and
+    FOLLOW build their dependency graphs once, collapse strongly connected
+    components and finish every component in one dependencies-first pass,
+    so the cost is close to linear in the size of the grammar.
+
+    Sets are stored compactly: first[nt] and follow[nt] are int bitmasks
+    over terminal IDs (bit 0 is '$'), and nullable is a bytearray, so unions
+    and ε checks are single word operations. first_sets()/follow_sets()
+    decode them into the set-of-names format used by CFG.
+    """
+
+    def __init__(self, productions, start_symbol, is_non_terminal=str.isupper):
+        self.start_symbol = start_symbol
+        self.non_terminals = list(productions)
+        self.nt_ids = {nt: i for i, nt in enumerate(self.non_terminals)}
+        self.terminals = [END_MARKER]
+        self.terminal_ids = {END_MARKER: 0}
+        if start_symbol not in self.nt_ids:
+            self._intern_non_terminal(start_symbol)
+
+        # (head, body) pairs with ε removed from the bodies
+        self.productions = []
+        for head, bodies in productions.items():
+            head_id = self.nt_ids[head]
+            for body in bodies:
+                encoded = []
+                for symbol in body:
+                    if symbol == EPSILON:
+                        continue
+                    if is_non_terminal(symbol):
+                        nt = self.nt_ids.get(symbol)
+                        if nt is None:
+                            nt = self._intern_non_terminal(symbol)
+                        encoded.append(nt)
+                    else:
+                        terminal = self.terminal_ids.get(symbol)
+                        if terminal is None:
+                            terminal = self.terminal_ids[symbol] = len(self.terminals)
+                            self.terminals.append(symbol)
+                        encoded.append(-terminal - 1)
+                self.productions.append((head_id, tuple(encoded)))
+
+        self.nullable = None
+        self.first = None
+        self.follow = None
+
+    @classmethod
+    def from_ir(cls, grammar):
+        """Build directly from a GrammarIR, without going through symbol names.
+
+        Non-terminals are numbered in GrammarIR.non_terminals() order and
+        terminals in GrammarIR.terminals() order after '$'; productions keep
+        the order of grammar.rules.
+        """
+        self = cls.__new__(cls)
+        names = grammar.symbols.names
+        non_terminals = grammar.non_terminals()
+        terminals = grammar.terminals()
+        self.start_symbol = names[grammar.start]
+        self.non_terminals = [names[nt] for nt in non_terminals]
+        self.nt_ids = {name: i for i, name in enumerate(self.non_terminals)}
+        self.terminals = [END_MARKER] + [names[t] for t in terminals]
+        self.terminal_ids = {name: i for i, name in enumerate(self.terminals)}
+
+        # IR symbol ID -> encoded symbol
+        encode = [0] * len(grammar.symbols)
+        for i, nt in enumerate(non_terminals):
+            encode[nt] = i
+        for j, terminal in enumerate(terminals, 1):
+            encode[terminal] = -j - 1
+        self.productions = [(encode[head], tuple(encode[symbol] for symbol in body))
+                            for head, bodies in grammar.rules.items() for body in bodies]
+        self.nullable = None
+        self.first = None
+        self.follow = None
+        return self
+
+    def _intern_non_terminal(self, symbol):
+        self.nt_ids[symbol] = len(self.non_terminals)
+        self.non_terminals.append(symbol)
+        return self.nt_ids[symbol]
+
+    def compute_first(self):
+        with instrumentation.stage('first'):
+            return self._compute_first()
+
+    def compute_follow(self):
+        if self.first is None:
+            self.compute_first()
+        with instrumentation.stage('follow'):
+            return self._compute_follow()
+
+    def _compute_first(self):
+        count = len(self.non_terminals)
+
+        # Nullable: a production becomes nullable once all its symbols are
+        nullable = bytearray(count)
+        remaining = []
+        occurrences = [[] for _ in range(count)]
+        worklist = []
+        for p, (head, body) in enumerate(self.productions):
+            if any(symbol < 0 for symbol in body):
+                remaining.append(-1)
+                continue
+            remaining.append(len(body))
+            for symbol in body:
+                occurrences[symbol].append(p)
+            if not body and not nullable[head]:
+                nullable[head] = 1
+                worklist.append(head)
+        steps = 0
+        while worklist:
+            symbol = worklist.pop()
+            steps += 1
+            for p in occurrences[symbol]:
+                remaining[p] -= 1
+                head = self.productions[p][0]
+                if remaining[p] == 0 and not nullable[head]:
+                    nullable[head] = 1
+                    worklist.append(head)
+
+        # FIRST(A) ⊇ FIRST(B) for every B reachable through a nullable prefix
+        direct = [0] * count
+        successors = [[] for _ in range(count)]
+        for head, body in self.productions:
+            for symbol in body:
+                if symbol < 0:
+                    direct[head] |= 1 << (-symbol - 1)
+                    break
+                successors[head].append(symbol)
+                if not nullable[symbol]:
+                    break
+
+        first = [None] * count
+        components = strongly_connected_components(successors)
+        for component in components:
+            result = 0
+            for member in component:
+                result |= direct[member]
+                for dependency in successors[member]:
+                    if first[dependency] is not None:
+                        result |= first[dependency]
+            for member in component:
+                first[member] = result
+
+        if instrumentation.hook is not None:
+            instrumentation.count('first.nullable_steps', steps)
+            _component_metrics('first', components, successors)
+        self.nullable = nullable
+        self.first = first
+        return self
+
+    def _compute_follow(self):
+        count = len(self.non_terminals)
+        nullable = self.nullable
+        first = self.first
+
+        # FOLLOW(B) gets FIRST of what follows B, and FOLLOW(A) if that is nullable
+        direct = [0] * count
+        direct[self.nt_ids[self.start_symbol]] = 1
+        successors = [[] for _ in range(count)]
+        for head, body in self.productions:
+            trailer = 0
+            trailer_nullable = True
+            for symbol in reversed(body):
+                if symbol < 0:
+                    trailer = 1 << (-symbol - 1)
+                    trailer_nullable = False
+                    continue
+                direct[symbol] |= trailer
+                if trailer_nullable and symbol != head:
+                    successors[symbol].append(head)
+                if nullable[symbol]:
+                    trailer |= first[symbol]
+                else:
+                    trailer = first[symbol]
+                    trailer_nullable = False
+
+        follow = [None] * count
+        components = strongly_connected_components(successors)
+        for component in components:
+            result = 0
+            for member in component:
+                result |= direct[member]
+                for dependency in successors[member]:
+                    if follow[dependency] is not None:
+                        result |= follow[dependency]
+            for member in component:
+                follow[member] = result
+
+        if instrumentation.hook is not None:
+            _component_metrics('follow', components, successors)
+        self.follow = follow
+        return self
+
+    def first_of_bits(self, body):
+        """FIRST of a symbol sequence as (terminal bitmask, nullable)."""
+        mask = 0
+        for symbol in body:
+            if symbol == EPSILON:
+                continue
+            nt = self.nt_ids.get(symbol)
+            if nt is None:
+                return mask | 1 << self.terminal_ids[symbol], False
+            mask |= self.first[nt]
+            if not self.nullable[nt]:
+                return mask, False
+        return mask, True
+
+    def first_of_encoded(self, body):
+        """Like first_of_bits for a body already in the internal encoding."""
+        mask = 0
+        first = self.first
+        nullable = self.nullable
+        for symbol in body:
+            if symbol < 0:
+                return mask | 1 << (-symbol - 1), False
+            mask |= first[symbol]
+            if not nullable[symbol]:
+                return mask, False
+        return mask, True
+
+    def first_of(self, body):
+        """FIRST of a symbol sequence as terminal names, with 'ε' if it is nullable."""
+        mask, nullable = self.first_of_bits(body)
+        names = self.decode(mask)
+        if nullable:
+            names.add(EPSILON)
+        return names
+
+    def decode(self, mask):
+        """Terminal names of the bits set in mask."""
+        names = set()
+        terminals = self.terminals
+        while mask:
+            low = mask & -mask
+            names.add(terminals[low.bit_length() - 1])
+            mask ^= low
+        return names
+
+    def first_sets(self):
+        """FIRST sets keyed by non-terminal name, in the format used by CFG."""
+        sets = {}
+        for nt, name in enumerate(self.non_terminals):
+            names = self.decode(self.first[nt])
+            if self.nullable[nt]:
+                names.add(EPSILON)
+            sets[name] = names
+        return sets
+
+    def follow_sets(self):
+        """FOLLOW sets keyed by non-terminal name, in the format used by CFG."""
+        return {name: self.decode(self.follow[nt]) for nt, name in enumerate(self.non_terminals)}
+
+    def to_numpy(self):
+        """FIRST and FOLLOW as NumPy bool matrices (non-terminal x terminal) and the nullable vector.
+
+        NumPy is optional and only imported here.
+        """
+        import numpy as np
+        width = len(self.terminals)
+        row_bytes = (width + 7) // 8
+
+        def unpack(masks):
+            raw = b''.join(mask.to_bytes(row_bytes, 'little') for mask in masks)
+            packed = np.frombuffer(raw, dtype=np.uint8).reshape(len(masks), row_bytes)
+            return np.unpackbits(packed, axis=1, bitorder='little')[:, :width].astype(bool)
+
+        return unpack(self.first), unpack(self.follow), np.frombuffer(bytes(self.nullable), dtype=bool)
+
+def main():
+    # Left-recursive grammar: the recursive get_first would never terminate here
+    productions = {
+        'E': [['E', '+', 'T'], ['T']],
+        'T': [['T', '*', 'F'], ['F']],
+        'F': [['(', 'E', ')'], ['id']],
+    }
+    analysis = GrammarAnalysis(productions, 'E').compute_follow()
+    first_sets = analysis.first_sets()
+    follow_sets = analysis.follow_sets()
+    for nt in sorted(first_sets):
+        print(f"FIRST({nt}) = {sorted(first_sets[nt])}    FOLLOW({nt}) = {sorted(follow_sets[nt])}")
+
+if __name__ == "__main__":
+    main()
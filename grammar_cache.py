@@ -0,0 +1,254 @@
+import hashlib
+import json
+import mmap
+import os
+import sys
+import threading
+from array import array
+
+from grammar_analysis import EPSILON, GrammarAnalysis
+from ll1_parser import CFG, CompiledParser, LL1Conflict
+from parse_table import CombTable, table_layout
+
+MAGIC = b'LL1CACHE'
+VERSION = 3
+SUFFIX = '.ll1'
+# Modules written by parser_codegen share the directory and its size cap
+MODULE_PREFIX = 'll1_generated_'
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+def default_cache_dir():
+    return os.environ.get('SYNTAX_LAB_CACHE_DIR',
+                          os.path.join(os.path.expanduser('~'), '.cache', 'syntax_analysis_lab'))
+
+def grammar_key(productions, start_symbol, is_non_terminal=str.isupper):
+    """Content hash of the normalized grammar: bodies as symbol lists, ε dropped, order kept."""
+    normalized = [start_symbol]
+    non_terminals = set()
+    for head, bodies in productions.items():
+        rows = []
+        for body in bodies:
+            symbols = [symbol for symbol in body if symbol != EPSILON]
+            non_terminals.update(symbol for symbol in symbols if is_non_terminal(symbol))
+            rows.append(symbols)
+        normalized.append([head, rows])
+    normalized.append(sorted(non_terminals))
+    data = json.dumps(normalized, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+class GrammarCache:
+    """Content-addressed on-disk cache of analyzed grammars and compiled tables.
+
+    Each entry is one binary file: a JSON header followed by 4-byte aligned
+    sections (nullable bytes, FIRST/FOLLOW bit rows, int32 production and
+    table arrays, the latter dense or row-displaced as compiled). LL(1)
+    conflicts found at compile time are kept in the header. Entries
+    are memory-mapped on load, and the parse table is used in place, so
+    processes loading the same entry share its pages. The directory is kept under max_bytes by evicting the
+    least recently used entries.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def path(self, cfg):
+        key = grammar_key(cfg.productions, cfg.start_symbol, cfg.is_non_terminal)
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def analyze(self, cfg):
+        """Fill cfg's FIRST and FOLLOW sets, from the cache when possible."""
+        if self.load(cfg, need_table=False) is None:
+            cfg.calculate_first()
+            cfg.calculate_follow()
+            parser = cfg.compile() if isinstance(cfg, CFG) else None
+            self.store(cfg, parser)
+        return cfg
+
+    def compile(self, cfg):
+        """Return a CompiledParser for cfg, skipping analysis on a cache hit."""
+        parser = self.load(cfg)
+        if parser is None:
+            cfg.calculate_first()
+            cfg.calculate_follow()
+            parser = cfg.compile()
+            self.store(cfg, parser)
+        return parser
+
+    def load(self, cfg, need_table=True):
+        """Restore cfg's analysis from the cache; returns the parser, True, or None on a miss."""
+        path = self.path(cfg)
+        try:
+            with open(path, 'rb') as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        view = memoryview(buffer)
+        if view[:len(MAGIC)] != MAGIC:
+            return None
+        header_length = int.from_bytes(view[len(MAGIC):len(MAGIC) + 4], 'little')
+        body = len(MAGIC) + 4
+        try:
+            header = json.loads(bytes(view[body:body + header_length]).decode('utf-8'))
+        except ValueError:
+            return None
+        if header.get('version') != VERSION or header.get('byteorder') != sys.byteorder:
+            return None
+        if need_table and 'parser' not in header:
+            return None
+
+        def section(name):
+            offset, length = header['sections'][name]
+            return view[offset:offset + length]
+
+        # Interning is cheap; only the fixpoint analysis is skipped
+        analysis = GrammarAnalysis(cfg.productions, cfg.start_symbol, cfg.is_non_terminal)
+        if analysis.terminals != header['terminals'] or analysis.non_terminals != header['non_terminals']:
+            return None
+        row_bytes = header['row_bytes']
+        first = bytes(section('first'))
+        follow = bytes(section('follow'))
+        analysis.nullable = bytearray(section('nullable'))
+        analysis.first = [int.from_bytes(first[i:i + row_bytes], 'little')
+                          for i in range(0, len(first), row_bytes)]
+        analysis.follow = [int.from_bytes(follow[i:i + row_bytes], 'little')
+                           for i in range(0, len(follow), row_bytes)]
+        cfg.analysis = analysis
+        cfg.first_sets.update(analysis.first_sets())
+        cfg.follow_sets.update(analysis.follow_sets())
+        conflicts = [LL1Conflict(*conflict) for conflict in header['conflicts']]
+        if hasattr(cfg, 'conflicts'):
+            cfg.conflicts = list(conflicts)
+
+        # Mark as recently used for the LRU eviction
+        os.utime(path)
+        if 'parser' not in header:
+            return True
+        parser = header['parser']
+        if parser['layout'] == 'comb':
+            table = CombTable(parser['num_terminals'], len(parser['symbols']) - parser['num_terminals'],
+                              section('table_base').cast('i'), section('table_check').cast('i'),
+                              section('table').cast('i'))
+        else:
+            table = section('table').cast('i')
+        return CompiledParser(parser['symbols'], parser['num_terminals'], parser['start'],
+                              section('prod_lhs').cast('i'), section('prod_offsets').cast('i'),
+                              section('prod_rhs').cast('i'), table,
+                              CompiledParser.sync_sets(parser['symbols'], parser['num_terminals'],
+                                                       cfg.follow_sets),
+                              conflicts)
+
+    def store(self, cfg, parser=None):
+        analysis = cfg.analysis
+        row_bytes = (len(analysis.terminals) + 7) // 8
+        sections = [
+            ('nullable', bytes(analysis.nullable)),
+            ('first', b''.join(mask.to_bytes(row_bytes, 'little') for mask in analysis.first)),
+            ('follow', b''.join(mask.to_bytes(row_bytes, 'little') for mask in analysis.follow)),
+        ]
+        header = {
+            'version': VERSION,
+            'byteorder': sys.byteorder,
+            'terminals': analysis.terminals,
+            'non_terminals': analysis.non_terminals,
+            'row_bytes': row_bytes,
+            'conflicts': [
+                [c.non_terminal, c.terminal, list(c.productions), sorted(c.sources)]
+                for c in (parser.conflicts if parser is not None else getattr(cfg, 'conflicts', ()))
+            ],
+        }
+        if parser is not None:
+            header['parser'] = {
+                'symbols': list(parser.symbols),
+                'num_terminals': parser.num_terminals,
+                'start': parser.start,
+                'layout': table_layout(parser.table),
+            }
+            sections += [
+                ('prod_lhs', array('i', parser.prod_lhs).tobytes()),
+                ('prod_offsets', array('i', parser.prod_offsets).tobytes()),
+                ('prod_rhs', array('i', parser.prod_rhs).tobytes()),
+            ]
+            table = parser.table
+            if isinstance(table, CombTable):
+                sections += [
+                    ('table_base', array('i', table.base).tobytes()),
+                    ('table_check', array('i', table.check).tobytes()),
+                    ('table', array('i', table.value).tobytes()),
+                ]
+            else:
+                sections.append(('table', array('i', table).tobytes()))
+
+        # Section offsets depend on the header length, so lay out until it is stable
+        offsets = {}
+        while True:
+            header['sections'] = offsets
+            encoded = json.dumps(header, ensure_ascii=False).encode('utf-8')
+            position = _align(len(MAGIC) + 4 + len(encoded))
+            layout = {}
+            for name, data in sections:
+                layout[name] = [position, len(data)]
+                position = _align(position + len(data))
+            if layout == offsets:
+                break
+            offsets = layout
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(cfg)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, 'wb') as f:
+            f.write(MAGIC)
+            f.write(len(encoded).to_bytes(4, 'little'))
+            f.write(encoded)
+            for name, data in sections:
+                f.write(b'\0' * (offsets[name][0] - f.tell()))
+                f.write(data)
+        os.replace(temporary, path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """Delete least recently used entries until the directory fits in max_bytes.
+
+        Generated parser modules (MODULE_PREFIX*.py) count as entries too.
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                name = entry.name
+                if name.endswith(SUFFIX) or (name.startswith(MODULE_PREFIX) and name.endswith('.py')):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+def _align(position):
+    return (position + 3) & ~3
+
+def main():
+    productions = {
+        'S': ['AB'],
+        'A': ['aA', 'ε'],
+        'B': ['b'],
+    }
+    cache = GrammarCache()
+    for run in range(2):
+        cfg = CFG(productions, 'S')
+        hit = os.path.exists(cache.path(cfg))
+        parser = cache.compile(cfg)
+        print(f"run {run + 1}: {'cache hit' if hit else 'analyzed and stored'}, "
+              f"FOLLOW(A) = {sorted(cfg.follow_sets['A'])}, 'aab' -> {parser.parse('aab')}")
+
+if __name__ == "__main__":
+    main()
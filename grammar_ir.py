@@ -0,0 +1,162 @@
+import re
+
+EPSILON = 'ε'
+
+class SymbolTable:
+    """Interned grammar symbols: names[id], ids[name] and a non-terminal flag per ID."""
+    __slots__ = ('names', 'ids', 'non_terminal', '_primes')
+
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+        self.non_terminal = bytearray()
+        self._primes = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, name, non_terminal=False):
+        symbol = self.ids.get(name)
+        if symbol is None:
+            symbol = self.ids[name] = len(self.names)
+            self.names.append(name)
+            self.non_terminal.append(1 if non_terminal else 0)
+        return symbol
+
+    def is_non_terminal(self, symbol):
+        return self.non_terminal[symbol]
+
+    def fresh(self, base):
+        """A new non-terminal named after base with primes (A', A'', ...).
+
+        The next prime count is remembered per base, so repeated calls do
+        not rescan the names already taken.
+        """
+        name = self.names[base]
+        primes = self._primes.get(base, 1)
+        while name + "'" * primes in self.ids:
+            primes += 1
+        self._primes[base] = primes + 1
+        return self.intern(name + "'" * primes, True)
+
+    def copy(self):
+        table = SymbolTable()
+        table.names = list(self.names)
+        table.ids = dict(self.ids)
+        table.non_terminal = bytearray(self.non_terminal)
+        table._primes = dict(self._primes)
+        return table
+
+def symbol_pattern(terminals=()):
+    """Regex splitting an unspaced body into symbols.
+
+    Known multi-character terminals match first (longest first), then an
+    uppercase letter with its primes is one non-terminal, and any other
+    character is a symbol of its own.
+    """
+    known = '|'.join(re.escape(t) for t in sorted(terminals, key=len, reverse=True))
+    return re.compile((known + '|' if known else '') + r"[A-Z]'*|\S")
+
+_DEFAULT_PATTERN = symbol_pattern()
+
+def split_symbols(body, pattern=_DEFAULT_PATTERN):
+    """Split a production body; whitespace-separated bodies are split on whitespace."""
+    body = body.strip()
+    if any(c.isspace() for c in body):
+        return body.split()
+    return pattern.findall(body)
+
+class GrammarIR:
+    """Grammar over interned symbols shared by every transformation and analysis.
+
+    rules maps a head symbol ID to its bodies, each a tuple of symbol IDs;
+    ε is the empty tuple. Heads keep insertion order and start is the ID of
+    the start symbol.
+    """
+    __slots__ = ('symbols', 'start', 'rules')
+
+    def __init__(self, symbols=None, start=None, rules=None):
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        self.start = start
+        self.rules = rules if rules is not None else {}
+
+    def __len__(self):
+        return sum(len(bodies) for bodies in self.rules.values())
+
+    def add(self, head, body):
+        self.rules.setdefault(head, []).append(tuple(body))
+
+    def copy(self):
+        return GrammarIR(self.symbols.copy(), self.start,
+                         {head: list(bodies) for head, bodies in self.rules.items()})
+
+    @classmethod
+    def from_dict(cls, productions, start_symbol, is_non_terminal=str.isupper, terminals=()):
+        """Build from the {head: [body, ...]} format used by the CFG classes.
+
+        String bodies are split with split_symbols; list bodies are taken as
+        symbol lists. 'ε' symbols are dropped.
+        """
+        grammar = cls()
+        symbols = grammar.symbols
+        pattern = symbol_pattern(terminals) if terminals else _DEFAULT_PATTERN
+        for head in productions:
+            symbols.intern(head, True)
+        grammar.start = symbols.intern(start_symbol, True)
+        for head, bodies in productions.items():
+            head_id = symbols.ids[head]
+            rules = grammar.rules.setdefault(head_id, [])
+            for body in bodies:
+                if isinstance(body, str):
+                    body = split_symbols(body, pattern)
+                rules.append(tuple(symbols.intern(symbol, is_non_terminal(symbol))
+                                   for symbol in body if symbol != EPSILON))
+        return grammar
+
+    @classmethod
+    def from_text(cls, text, start_symbol=None, terminals=()):
+        """Parse 'A -> x | y' lines with grammar_loader; the first head is the start symbol unless given."""
+        from grammar_loader import load_grammar_text
+        return load_grammar_text(text, start_symbol, terminals, validate=False)
+
+    def to_dict(self):
+        """{head: [[symbol, ...], ...]} with ['ε'] for empty bodies."""
+        names = self.symbols.names
+        return {names[head]: [[names[s] for s in body] or [EPSILON] for body in bodies]
+                for head, bodies in self.rules.items()}
+
+    def to_text(self, separator=''):
+        names = self.symbols.names
+        lines = []
+        for head, bodies in self.rules.items():
+            alternatives = [separator.join(names[s] for s in body) or EPSILON for body in bodies]
+            lines.append(f"{names[head]} -> {' | '.join(alternatives)}")
+        return '\n'.join(lines)
+
+    def non_terminals(self):
+        """Heads in order, then non-terminals that only appear in bodies."""
+        result = list(self.rules)
+        seen = set(result)
+        is_non_terminal = self.symbols.non_terminal
+        for bodies in self.rules.values():
+            for body in bodies:
+                for symbol in body:
+                    if is_non_terminal[symbol] and symbol not in seen:
+                        seen.add(symbol)
+                        result.append(symbol)
+        if self.start not in seen:
+            result.append(self.start)
+        return result
+
+    def terminals(self):
+        """Terminals in order of first appearance."""
+        result = []
+        seen = set()
+        is_non_terminal = self.symbols.non_terminal
+        for bodies in self.rules.values():
+            for body in bodies:
+                for symbol in body:
+                    if not is_non_terminal[symbol] and symbol not in seen:
+                        seen.add(symbol)
+                        result.append(symbol)
+        return result
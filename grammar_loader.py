@@ -0,0 +1,171 @@
+import mmap
+import sys
+import time
+
+from grammar_ir import EPSILON, GrammarIR, symbol_pattern
+
+class GrammarError(ValueError):
+    """A grammar file that cannot be used; problems lists one message per issue."""
+
+    def __init__(self, problems):
+        self.problems = list(problems)
+        super().__init__('\n'.join(self.problems))
+
+def load_grammar(path, start_symbol=None, terminals=(), pattern=None,
+                 is_non_terminal=str.isupper, validate=True):
+    """Load a grammar file through a read-only memory map, one line at a time."""
+    with open(path, 'rb') as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return load_grammar_lines((), start_symbol, terminals, pattern,
+                                      is_non_terminal, validate, path)
+        with buffer:
+            lines = (line.decode('utf-8') for line in iter(buffer.readline, b''))
+            return load_grammar_lines(lines, start_symbol, terminals, pattern,
+                                      is_non_terminal, validate, path)
+
+def load_grammar_text(text, start_symbol=None, terminals=(), pattern=None,
+                      is_non_terminal=str.isupper, validate=True):
+    return load_grammar_lines(text.splitlines(), start_symbol, terminals, pattern,
+                              is_non_terminal, validate, '<text>')
+
+def load_grammar_lines(lines, start_symbol=None, terminals=(), pattern=None,
+                       is_non_terminal=str.isupper, validate=True, source='<grammar>'):
+    """Build a GrammarIR from 'A -> x | y' lines, interning symbols as they are read.
+
+    lines may be any iterable of str (a file object, sys.stdin, ...). Blank
+    lines and lines starting with '#' are skipped, a line starting with '|'
+    continues the previous head, and a head may appear on several lines.
+    Bodies containing whitespace are split on it; otherwise pattern (by
+    default symbol_pattern(terminals)) splits them. 'ε' is the empty body.
+    The first head is the start symbol unless start_symbol is given.
+
+    Malformed lines raise GrammarError with the line number. With validate,
+    non-terminals used but never defined, or unreachable from the start
+    symbol, are reported the same way.
+    """
+    findall = (pattern or symbol_pattern(terminals)).findall
+    grammar = GrammarIR()
+    symbols = grammar.symbols
+    ids = symbols.ids
+    names = symbols.names
+    flags = symbols.non_terminal
+    rules = grammar.rules
+    defined_at = {}
+    used_at = {}
+    problems = []
+    head = None
+
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line[0] == '#':
+            continue
+        arrow = line.find('->')
+        if arrow >= 0:
+            name = line[:arrow].strip()
+            if not name or any(c.isspace() for c in name) or '|' in name:
+                problems.append(f"{source}:{number}: invalid head {name!r}")
+                continue
+            head = ids.get(name)
+            if head is None:
+                head = ids[name] = len(names)
+                names.append(name)
+                flags.append(1)
+            else:
+                flags[head] = 1
+            if head not in defined_at:
+                defined_at[head] = number
+            rhs = line[arrow + 2:]
+        elif line[0] == '|' and head is not None:
+            rhs = line[1:]
+        else:
+            problems.append(f"{source}:{number}: expected 'A -> body | ...', got {line!r}")
+            continue
+
+        bodies = rules.setdefault(head, [])
+        for alternative in rhs.split('|'):
+            alternative = alternative.strip()
+            if not alternative:
+                problems.append(f"{source}:{number}: empty alternative for {names[head]} "
+                                f"(write {EPSILON} for the empty body)")
+                continue
+            parts = alternative.split() if any(c.isspace() for c in alternative) else findall(alternative)
+            body = []
+            for part in parts:
+                if part == EPSILON:
+                    continue
+                symbol = ids.get(part)
+                if symbol is None:
+                    symbol = ids[part] = len(names)
+                    names.append(part)
+                    flags.append(1 if is_non_terminal(part) else 0)
+                if flags[symbol] and symbol not in used_at:
+                    used_at[symbol] = number
+                body.append(symbol)
+            bodies.append(tuple(body))
+
+    if problems:
+        raise GrammarError(problems)
+    if not rules:
+        raise GrammarError([f"{source}: no productions"])
+    if start_symbol is None:
+        grammar.start = next(iter(rules))
+    elif start_symbol in ids and ids[start_symbol] in rules:
+        grammar.start = ids[start_symbol]
+    else:
+        raise GrammarError([f"{source}: start symbol {start_symbol!r} has no productions"])
+
+    if validate:
+        undefined, unreachable = check_grammar(grammar)
+        problems = [f"{source}:{used_at[nt]}: non-terminal {names[nt]} is used but never defined"
+                    for nt in undefined]
+        problems += [f"{source}:{defined_at[nt]}: non-terminal {names[nt]} is unreachable "
+                     f"from {names[grammar.start]}" for nt in unreachable]
+        if problems:
+            raise GrammarError(problems)
+    return grammar
+
+def check_grammar(grammar):
+    """(undefined, unreachable) non-terminal IDs of a GrammarIR.
+
+    Undefined ones appear in bodies without productions of their own;
+    unreachable ones have productions but cannot be derived from the start
+    symbol. Both lists are in order of first appearance.
+    """
+    rules = grammar.rules
+    flags = grammar.symbols.non_terminal
+    reachable = {grammar.start}
+    worklist = [grammar.start]
+    undefined = {}
+    while worklist:
+        for body in rules.get(worklist.pop(), ()):
+            for symbol in body:
+                if flags[symbol] and symbol not in reachable:
+                    reachable.add(symbol)
+                    if symbol in rules:
+                        worklist.append(symbol)
+    for bodies in rules.values():
+        for body in bodies:
+            for symbol in body:
+                if flags[symbol] and symbol not in rules:
+                    undefined[symbol] = None
+    unreachable = [head for head in rules if head not in reachable]
+    return list(undefined), unreachable
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else 'grammar.txt'
+    started = time.perf_counter()
+    try:
+        grammar = load_grammar(path, terminals=('id',))
+    except GrammarError as error:
+        print(f"error: {error}")
+        return
+    seconds = time.perf_counter() - started
+    print(grammar.to_text())
+    print(f"{len(grammar)} productions, {len(grammar.rules)} non-terminals "
+          f"loaded in {seconds * 1000:.2f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import time
+
+import instrumentation
+from elimination_left_recur import remove_unit_cycles
+from grammar_analysis import strongly_connected_components
+from grammar_ir import GrammarIR
+
+class SimplificationReport:
+    """What simplify() removed from a grammar."""
+
+    def __init__(self):
+        self.rules_before = 0
+        self.rules_after = 0
+        self.non_generating = 0
+        self.unreachable = 0
+        self.unit_cycles = 0
+        self.unit_productions = 0
+        self.seconds = 0.0
+
+    def __str__(self):
+        return (f"rules {self.rules_before} -> {self.rules_after}, "
+                f"non-generating {self.non_generating}, unreachable {self.unreachable}, "
+                f"unit cycles collapsed {self.unit_cycles}, unit productions inlined "
+                f"{self.unit_productions}, {self.seconds:.3f}s")
+
+def generating_non_terminals(grammar):
+    """Non-terminals deriving at least one terminal string (ε included).
+
+    Counting worklist: a body becomes generating once all of its
+    non-terminals are, so every body is touched once per symbol.
+    """
+    is_non_terminal = grammar.symbols.non_terminal
+    generating = set()
+    worklist = []
+    occurrences = {}
+    for head, bodies in grammar.rules.items():
+        for body in bodies:
+            pending = [symbol for symbol in body if is_non_terminal[symbol]]
+            if not pending:
+                if head not in generating:
+                    generating.add(head)
+                    worklist.append(head)
+                continue
+            entry = [len(pending), head]
+            for symbol in pending:
+                occurrences.setdefault(symbol, []).append(entry)
+    while worklist:
+        for entry in occurrences.get(worklist.pop(), ()):
+            entry[0] -= 1
+            if entry[0] == 0 and entry[1] not in generating:
+                generating.add(entry[1])
+                worklist.append(entry[1])
+    return generating
+
+def reachable_non_terminals(grammar):
+    """Non-terminals with productions that can be derived from the start symbol."""
+    is_non_terminal = grammar.symbols.non_terminal
+    rules = grammar.rules
+    reachable = {grammar.start}
+    worklist = [grammar.start]
+    while worklist:
+        for body in rules.get(worklist.pop(), ()):
+            for symbol in body:
+                if is_non_terminal[symbol] and symbol not in reachable and symbol in rules:
+                    reachable.add(symbol)
+                    worklist.append(symbol)
+    return reachable
+
+def remove_useless(grammar, report=None):
+    """Drop productions using non-generating symbols, then unreachable non-terminals.
+
+    The order matters: removing non-generating bodies can make more
+    non-terminals unreachable, never the other way round. The start symbol
+    is always kept, with no productions if its language is empty.
+    """
+    is_non_terminal = grammar.symbols.non_terminal
+    generating = generating_non_terminals(grammar)
+    rules = {}
+    for head, bodies in grammar.rules.items():
+        if head in generating:
+            rules[head] = [body for body in bodies
+                           if all(symbol in generating or not is_non_terminal[symbol]
+                                  for symbol in body)]
+    rules.setdefault(grammar.start, [])
+    pruned = GrammarIR(grammar.symbols.copy(), grammar.start, rules)
+    reachable = reachable_non_terminals(pruned)
+    pruned.rules = {head: bodies for head, bodies in rules.items() if head in reachable}
+    if report is not None:
+        report.non_generating += sum(1 for head in grammar.rules if head not in generating)
+        report.unreachable += sum(1 for head in rules if head not in reachable)
+    return pruned
+
+def remove_unit_productions(grammar, report=None):
+    """Replace every A -> B by the bodies of B.
+
+    Unit cycles are merged first (remove_unit_cycles), so the unit graph is
+    acyclic and each non-terminal is resolved once, dependencies first,
+    from bodies that are already unit-free.
+    """
+    grammar = remove_unit_cycles(grammar, report)
+    is_non_terminal = grammar.symbols.non_terminal
+    heads = list(grammar.rules)
+    index = {head: i for i, head in enumerate(heads)}
+    successors = [[] for _ in heads]
+    for head, bodies in grammar.rules.items():
+        for body in bodies:
+            if len(body) == 1 and is_non_terminal[body[0]] and body[0] in index:
+                successors[index[head]].append(index[body[0]])
+
+    resolved = {}
+    inlined = 0
+    for component in strongly_connected_components(successors):
+        head = heads[component[0]]
+        bodies = {}
+        for body in grammar.rules[head]:
+            if len(body) == 1 and body[0] in resolved:
+                inlined += 1
+                for inner in resolved[body[0]]:
+                    if inner != (head,):
+                        bodies[inner] = None
+            else:
+                bodies[body] = None
+        resolved[head] = list(bodies)
+    if report is not None:
+        report.unit_productions += inlined
+    result = GrammarIR(grammar.symbols.copy(), grammar.start,
+                       {head: resolved[head] for head in heads})
+    # Targets only used through unit productions are unreachable now
+    reachable = reachable_non_terminals(result)
+    result.rules = {head: bodies for head, bodies in result.rules.items() if head in reachable}
+    return result
+
+def simplify(grammar, report=None, units=True):
+    """Remove non-generating and unreachable non-terminals and, with units, unit productions.
+
+    Returns a new GrammarIR for the same language. report, a
+    SimplificationReport, is filled in if given.
+    """
+    started = time.perf_counter()
+    if report is not None:
+        report.rules_before = len(grammar)
+    grammar = remove_useless(grammar, report)
+    if units:
+        grammar = remove_unit_productions(grammar, report)
+    seconds = time.perf_counter() - started
+    if report is not None:
+        report.rules_after = len(grammar)
+        report.seconds = seconds
+    instrumentation.observe('simplify.seconds', seconds)
+    return grammar
+
+def main():
+    # Test case 2 of first_and_follow_set.main: A is unreachable; C never terminates
+    grammar = GrammarIR.from_text('''
+    S -> aS | b | B
+    A -> a | b
+    B -> c | C
+    C -> aC
+    ''')
+    report = SimplificationReport()
+    print(simplify(grammar, report).to_text())
+    print(report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+from collections import Counter, defaultdict
+
+from grammar_analysis import END_MARKER, EPSILON, strongly_connected_components
+from ll1_parser import CompiledParser
+
+class IncrementalGrammar:
+    """Analyzed grammar that can be edited without re-analyzing all of it.
+
+    Keeps nullable, FIRST/FOLLOW bitmasks and the predictive table by
+    non-terminal name. After an edit only the non-terminals that can be
+    affected are recomputed: FIRST for those whose productions reach the
+    edited head, FOLLOW for those whose occurrences or tail contexts
+    changed, and the table rows depending on either. Each edit returns
+    the set of non-terminals whose table rows were rebuilt.
+    """
+
+    def __init__(self, productions, start_symbol, is_non_terminal=str.isupper):
+        self.start_symbol = start_symbol
+        self.is_non_terminal = is_non_terminal
+        self.productions = {}
+        self.terminals = [END_MARKER]
+        self.terminal_ids = {END_MARKER: 0}
+        # users[nt] counts, per head, the bodies of that head mentioning nt
+        self.users = defaultdict(Counter)
+        self.nullable = {}
+        self.first = {}
+        self.follow = {}
+        self.table = {}
+        self.first_changed = set()
+        self.follow_changed = set()
+
+        self._declare(start_symbol)
+        for head, bodies in productions.items():
+            self._declare(head)
+            for body in bodies:
+                self._insert(head, self._normalize(body))
+        everything = set(self.first)
+        self._update(everything, everything)
+
+    # Editing
+
+    def add_production(self, head, body):
+        body = self._normalize(body)
+        self._declare(head)
+        self._insert(head, body)
+        return self._update({head}, set(body))
+
+    def remove_production(self, head, body):
+        body = self._normalize(body)
+        if body not in self.productions.get(head, ()):
+            raise ValueError(f"{head} -> {''.join(body)} is not a production")
+        self._delete(head, body)
+        return self._update({head}, set(body))
+
+    def replace_alternatives(self, head, bodies):
+        self._declare(head)
+        touched = set()
+        for body in list(self.productions.get(head, ())):
+            touched.update(body)
+            self._delete(head, body)
+        for body in bodies:
+            body = self._normalize(body)
+            touched.update(body)
+            self._insert(head, body)
+        return self._update({head}, touched)
+
+    def _normalize(self, body):
+        symbols = []
+        for symbol in body:
+            if symbol == EPSILON:
+                continue
+            if self.is_non_terminal(symbol):
+                self._declare(symbol)
+            elif symbol not in self.terminal_ids:
+                self.terminal_ids[symbol] = len(self.terminals)
+                self.terminals.append(symbol)
+            symbols.append(symbol)
+        # ε bodies are kept as ('ε',) so they stay truthy in the table, as in CFG
+        return tuple(symbols) if symbols else (EPSILON,)
+
+    def _declare(self, nt):
+        if nt not in self.first:
+            self.nullable[nt] = False
+            self.first[nt] = 0
+            self.follow[nt] = 0
+        self.productions.setdefault(nt, [])
+
+    def _insert(self, head, body):
+        self.productions[head].append(body)
+        for symbol in set(body):
+            if symbol in self.first:
+                self.users[symbol][head] += 1
+
+    def _delete(self, head, body):
+        self.productions[head].remove(body)
+        for symbol in set(body):
+            if symbol in self.first:
+                users = self.users[symbol]
+                users[head] -= 1
+                if not users[head]:
+                    del users[head]
+
+    # Re-analysis
+
+    def _update(self, heads, touched):
+        affected = _closure(heads, lambda nt: self.users[nt])
+        self.first_changed = self._solve_first(affected)
+
+        # FOLLOW can change for symbols in edited bodies, for symbols sharing a
+        # body with a FIRST-changed non-terminal, and downstream of those
+        seeds = {symbol for symbol in touched if symbol in self.first}
+        for nt in self.first_changed:
+            for head in self.users[nt]:
+                for body in self.productions[head]:
+                    if nt in body:
+                        seeds.update(symbol for symbol in body if symbol in self.first)
+        affected = _closure(seeds, self._tail_non_terminals)
+        self.follow_changed = self._solve_follow(affected)
+
+        rows = set(heads) | self.first_changed | self.follow_changed
+        for nt in self.first_changed:
+            rows.update(self.users[nt])
+        for nt in rows:
+            self._build_row(nt)
+        return rows
+
+    def _tail_non_terminals(self, head):
+        for body in self.productions.get(head, ()):
+            for symbol in reversed(body):
+                if symbol not in self.first:
+                    break
+                yield symbol
+                if not self.nullable[symbol]:
+                    break
+
+    def _solve_first(self, affected):
+        nodes = list(affected)
+        index = {nt: i for i, nt in enumerate(nodes)}
+        old = {nt: (self.nullable[nt], self.first[nt]) for nt in nodes}
+        nullable = self.nullable
+        for nt in nodes:
+            nullable[nt] = False
+
+        # Counting worklist; non-terminals outside the affected set are fixed
+        occurrences = defaultdict(list)
+        worklist = []
+        for head in nodes:
+            for body in self.productions.get(head, ()):
+                entry = [0, head]
+                for symbol in body:
+                    if symbol in index:
+                        entry[0] += 1
+                    elif symbol != EPSILON and not (symbol in self.first and nullable[symbol]):
+                        break
+                else:
+                    if entry[0] == 0:
+                        if not nullable[head]:
+                            nullable[head] = True
+                            worklist.append(head)
+                        continue
+                    for symbol in body:
+                        if symbol in index:
+                            occurrences[symbol].append(entry)
+        while worklist:
+            for entry in occurrences[worklist.pop()]:
+                entry[0] -= 1
+                if entry[0] == 0 and not nullable[entry[1]]:
+                    nullable[entry[1]] = True
+                    worklist.append(entry[1])
+
+        direct = [0] * len(nodes)
+        successors = [[] for _ in nodes]
+        for i, head in enumerate(nodes):
+            for body in self.productions.get(head, ()):
+                for symbol in body:
+                    if symbol == EPSILON:
+                        break
+                    if symbol not in self.first:
+                        direct[i] |= 1 << self.terminal_ids[symbol]
+                        break
+                    if symbol in index:
+                        successors[i].append(index[symbol])
+                    else:
+                        direct[i] |= self.first[symbol]
+                    if not nullable[symbol]:
+                        break
+        first = _solve_components(direct, successors)
+        for i, nt in enumerate(nodes):
+            self.first[nt] = first[i]
+        return {nt for nt in nodes if old[nt] != (nullable[nt], self.first[nt])}
+
+    def _solve_follow(self, affected):
+        nodes = list(affected)
+        index = {nt: i for i, nt in enumerate(nodes)}
+        old = {nt: self.follow[nt] for nt in nodes}
+        direct = [0] * len(nodes)
+        successors = [[] for _ in nodes]
+        if self.start_symbol in index:
+            direct[index[self.start_symbol]] = 1
+
+        # Scan every body that mentions an affected non-terminal, right to left
+        heads = set()
+        for nt in nodes:
+            heads.update(self.users[nt])
+        for head in heads:
+            for body in self.productions[head]:
+                trailer = 0
+                trailer_nullable = True
+                for symbol in reversed(body):
+                    if symbol == EPSILON:
+                        continue
+                    if symbol not in self.first:
+                        trailer = 1 << self.terminal_ids[symbol]
+                        trailer_nullable = False
+                        continue
+                    i = index.get(symbol)
+                    if i is not None:
+                        direct[i] |= trailer
+                        if trailer_nullable and head != symbol:
+                            if head in index:
+                                successors[i].append(index[head])
+                            else:
+                                direct[i] |= self.follow[head]
+                    if self.nullable[symbol]:
+                        trailer |= self.first[symbol]
+                    else:
+                        trailer = self.first[symbol]
+                        trailer_nullable = False
+        follow = _solve_components(direct, successors)
+        for i, nt in enumerate(nodes):
+            self.follow[nt] = follow[i]
+        return {nt for nt in nodes if old[nt] != self.follow[nt]}
+
+    def _first_of_bits(self, body):
+        mask = 0
+        for symbol in body:
+            if symbol == EPSILON:
+                continue
+            if symbol not in self.first:
+                return mask | 1 << self.terminal_ids[symbol], False
+            mask |= self.first[symbol]
+            if not self.nullable[symbol]:
+                return mask, False
+        return mask, True
+
+    def _build_row(self, nt):
+        row = {}
+        for body in self.productions.get(nt, ()):
+            mask, nullable = self._first_of_bits(body)
+            if nullable:
+                mask |= self.follow[nt]
+            for terminal in _bits(mask):
+                row[self.terminals[terminal]] = body
+        if row:
+            self.table[nt] = row
+        else:
+            self.table.pop(nt, None)
+
+    # Queries
+
+    def build_parsing_table(self):
+        """The up-to-date predictive table (rows are maintained incrementally)."""
+        return self.table
+
+    def compile(self):
+        return CompiledParser.from_cfg(self)
+
+    def first_sets(self):
+        sets = {}
+        for nt, mask in self.first.items():
+            names = {self.terminals[t] for t in _bits(mask)}
+            if self.nullable[nt]:
+                names.add(EPSILON)
+            sets[nt] = names
+        return sets
+
+    def follow_sets(self):
+        return {nt: {self.terminals[t] for t in _bits(mask)} for nt, mask in self.follow.items()}
+
+def _closure(seeds, successors):
+    seen = set(seeds)
+    worklist = list(seeds)
+    while worklist:
+        for target in successors(worklist.pop()):
+            if target not in seen:
+                seen.add(target)
+                worklist.append(target)
+    return seen
+
+def _solve_components(direct, successors):
+    result = [None] * len(direct)
+    for component in strongly_connected_components(successors):
+        mask = 0
+        for member in component:
+            mask |= direct[member]
+            for dependency in successors[member]:
+                if result[dependency] is not None:
+                    mask |= result[dependency]
+        for member in component:
+            result[member] = mask
+    return result
+
+def _bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+def main():
+    grammar = IncrementalGrammar({
+        'S': ['AB'],
+        'A': ['aA', 'ε'],
+        'B': ['b'],
+    }, 'S')
+    print(f"FOLLOW(A) = {sorted(grammar.follow_sets()['A'])}")
+
+    rows = grammar.add_production('B', 'cB')
+    print(f"after B -> cB: rebuilt rows {sorted(rows)}, FOLLOW(A) = {sorted(grammar.follow_sets()['A'])}")
+    print(f"'aacb' -> {grammar.compile().parse('aacb')}")
+
+    rows = grammar.replace_alternatives('A', ['a'])
+    print(f"after A -> a: rebuilt rows {sorted(rows)}, FIRST(S) = {sorted(grammar.first_sets()['S'])}")
+
+if __name__ == "__main__":
+    main()
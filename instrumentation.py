@@ -0,0 +1,180 @@
+import json
+import math
+import threading
+import time
+from bisect import bisect_left
+
+# The active metrics callback, called as hook(kind, name, value) with kind
+# 'counter' or 'histogram'; None disables instrumentation. Instrumented code
+# tests this before measuring anything, so when disabled a stage costs one
+# attribute lookup and the parse loop nothing at all.
+hook = None
+
+def set_hook(callback):
+    """Install callback (or None) as the metrics hook; returns the previous one."""
+    global hook
+    previous = hook
+    hook = callback
+    return previous
+
+def count(name, value=1):
+    if hook is not None:
+        hook('counter', name, value)
+
+def observe(name, value):
+    if hook is not None:
+        hook('histogram', name, value)
+
+class _Stage:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe(f"{self.name}.seconds", time.perf_counter() - self.started)
+        return False
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NO_STAGE = _NoStage()
+
+def stage(name):
+    """Context manager recording the time spent in a pipeline stage as <name>.seconds."""
+    return _NO_STAGE if hook is None else _Stage(name)
+
+# Powers of ten cover both durations in seconds and per-grammar sizes
+DEFAULT_BUCKETS = tuple(10.0 ** e for e in range(-6, 7))
+
+class Histogram:
+    """Bucketed distribution: counts[i] is the number of values <= bounds[i] (and > bounds[i - 1])."""
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'buckets': dict(zip([*map(str, self.bounds), '+Inf'], self.counts)),
+        }
+
+class MetricsRegistry:
+    """Metrics hook collecting counters and histograms in memory.
+
+    Use install() as a context manager (or set_hook(registry)) to enable it,
+    then export with snapshot(), to_json() or prometheus().
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}
+        # Parses on several threads report to the same registry
+        self._lock = threading.Lock()
+
+    def __call__(self, kind, name, value):
+        with self._lock:
+            if kind == 'counter':
+                self.counters[name] = self.counters.get(name, 0) + value
+            else:
+                histogram = self.histograms.get(name)
+                if histogram is None:
+                    histogram = self.histograms[name] = Histogram(self.buckets)
+                histogram.add(value)
+
+    def install(self):
+        return _Installed(self)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'histograms': {name: h.to_dict() for name, h in self.histograms.items()},
+            }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def prometheus(self, prefix='ll1_'):
+        """Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = dict(self.histograms)
+        lines = []
+        for name, value in sorted(counters.items()):
+            metric = prefix + _metric_name(name)
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for name, histogram in sorted(histograms.items()):
+            metric = prefix + _metric_name(name)
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, bucket in zip([*map(repr, histogram.bounds), '+Inf'], histogram.counts):
+                cumulative += bucket
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f"{metric}_sum {histogram.sum}")
+            lines.append(f"{metric}_count {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+class _Installed:
+    def __init__(self, registry):
+        self.registry = registry
+
+    def __enter__(self):
+        self.previous = set_hook(self.registry)
+        return self.registry
+
+    def __exit__(self, *exc_info):
+        set_hook(self.previous)
+        return False
+
+def _metric_name(name):
+    return ''.join(c if c.isalnum() else '_' for c in name)
+
+def main():
+    # Run as a script this module is __main__; the pipeline reports to the imported one
+    import instrumentation
+    from grammar_ir import GrammarIR
+    from pipeline import build_parser
+
+    grammar = GrammarIR.from_text('''
+    E -> E+T | T
+    T -> T*F | F
+    F -> (E) | id
+    ''', terminals=('id',))
+    with instrumentation.MetricsRegistry().install() as registry:
+        _, _, parser = build_parser(grammar)
+        for tokens in (['id', '+', 'id', '*', 'id'], ['(', 'id', ')'], ['id', '+', '*']):
+            parser.parse(tokens)
+    print(registry.prometheus())
+
+if __name__ == "__main__":
+    main()
@@ -1,86 +1,74 @@
-from collections import defaultdict
+import time
+from collections import defaultdict, deque
 
-def find_common_prefix_groups(productions):
-    groups = defaultdict(list)
-    for prod in productions:
-        if not prod or prod == 'ε':
-            prefix = 'ε'
-        else:
-            prefix = prod[0]
-        groups[prefix].append(prod)
-    return groups
+import instrumentation
+from grammar_ir import GrammarIR
+from grammar_loader import load_grammar_text
 
-def find_longest_common_prefix(strings):
-    """查找一组字符串的最长公共前缀"""
-    if not strings:
-        return ""
-    if len(strings) == 1:
-        return strings[0]
-    
-    min_len = min(len(s) for s in strings)
-    for i in range(min_len):
-        if not all(s[i] == strings[0][i] for s in strings):
-            return strings[0][:i]
-    return strings[0][:min_len]
+def build_trie(bodies):
+    """把候选式（符号元组）插入前缀树，键 None 表示候选式在该结点结束"""
+    root = {}
+    for body in bodies:
+        node = root
+        for symbol in body:
+            child = node.get(symbol)
+            if child is None:
+                child = node[symbol] = {}
+            node = child
+        node[None] = None
+    return root
+
+def left_factor_ir(grammar):
+    """用前缀树按符号对 GrammarIR 提取左公因子，返回新的 GrammarIR
+
+    每个非终结符的候选式只插入前缀树一次；沿单分支路径收集公共前缀，
+    每个分叉结点生成一个新的非终结符，因此总代价与候选式长度之和成线性，
+    且不构造任何中间子串。
+    """
+    started = time.perf_counter()
+    symbols = grammar.symbols.copy()
+    result = GrammarIR(symbols, grammar.start)
+    pending = deque((head, build_trie(bodies)) for head, bodies in grammar.rules.items())
+    while pending:
+        head, node = pending.popleft()
+        bodies = result.rules.setdefault(head, [])
+        for symbol, child in node.items():
+            if symbol is None:
+                bodies.append(())
+                continue
+            # 沿单分支路径下行，得到该组的最长公共前缀
+            prefix = [symbol]
+            while len(child) == 1:
+                symbol, grandchild = next(iter(child.items()))
+                if symbol is None:
+                    break
+                prefix.append(symbol)
+                child = grandchild
+            if len(child) == 1:
+                # 只剩结束标记：这是一个完整的候选式
+                bodies.append(tuple(prefix))
+            else:
+                new_symbol = symbols.fresh(head)
+                bodies.append(tuple(prefix) + (new_symbol,))
+                pending.append((new_symbol, child))
+    if instrumentation.hook is not None:
+        instrumentation.observe('left_factor.seconds', time.perf_counter() - started)
+        instrumentation.count('left_factor.new_non_terminals', len(result.rules) - len(grammar.rules))
+    return result
 
 def extract_left_factoring(cfg):
     # 输入检查
     if not cfg or not cfg.strip():
         return {}
-    
-    grammar = defaultdict(list)
-    for production in cfg.split('\n'):
-        if not production.strip():
-            continue
-        try:
-            lhs, rhs = production.split(' -> ')
-            grammar[lhs.strip()].extend(r.strip() for r in rhs.split(' | '))
-        except ValueError:
-            continue
 
+    # 与其他模块共用 grammar_loader 读取文法，格式错误时抛出 GrammarError
     result = defaultdict(list)
+    grammar = load_grammar_text(cfg, validate=False)
 
-    def process_productions(symbol, productions):
-        if not productions:
-            return
-        
-        # 按前缀分组
-        prefix_groups = find_common_prefix_groups(productions)
-        
-        for prefix, group in prefix_groups.items():
-            if prefix == 'ε':
-                result[symbol].append('ε')
-                continue
-                
-            if len(group) == 1:
-                result[symbol].append(group[0])
-                continue
-            
-            # 找到最长公共前缀
-            common_prefix = find_longest_common_prefix(group)
-            if len(common_prefix) > 0:
-                new_symbol = f"{symbol}'"
-                while new_symbol in result:
-                    new_symbol += "'"
-                
-                # 添加新的产生式规则
-                result[symbol].append(f"{common_prefix}{new_symbol}")
-                
-                # 处理剩余部分
-                remainders = []
-                for prod in group:
-                    remainder = prod[len(common_prefix):]
-                    remainders.append(remainder if remainder else 'ε')
-                
-                # 递归处理剩余部分
-                process_productions(new_symbol, remainders)
-            else:
-                result[symbol].extend(group)
-
-    # 处理每个非终结符的产生式
-    for lhs, rhs_list in grammar.items():
-        process_productions(lhs, rhs_list)
-
+    # 按符号（大写字母连同其后的 ' 为一个非终结符）提取左公因子
+    factored = left_factor_ir(grammar)
+    for lhs, rhs_list in factored.to_dict().items():
+        result[lhs] = [''.join(rhs) for rhs in rhs_list]
     return result
 
 # 测试代码
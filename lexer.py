@@ -0,0 +1,130 @@
+import io
+import mmap
+import re
+
+DEFAULT_SKIP = r'\s+'
+
+class Lexer:
+    """Tokenizer for a fixed set of literal terminals.
+
+    All terminals are compiled into one alternation, longest first, so each
+    token is a single regex match (longest match wins). Text matching no
+    terminal is emitted one character at a time, so the parser reports it
+    as an unknown terminal at the right position. Tokens are produced
+    lazily from strings, bytes, memory-mapped files or chunked streams.
+    """
+
+    def __init__(self, terminals, skip=DEFAULT_SKIP):
+        terminals = sorted({t for t in terminals if t}, key=len, reverse=True)
+        self.terminals = tuple(terminals)
+        self.max_length = max((len(t) for t in terminals), default=1)
+        alternatives = '|'.join(re.escape(t) for t in terminals) or r'(?!)'
+        skip_part = f'(?:{skip})|' if skip else ''
+        self.pattern = re.compile(f'{skip_part}({alternatives})|(.)', re.DOTALL)
+        self.bytes_pattern = re.compile(
+            f'{skip_part}({alternatives})|(.)'.encode('utf-8'), re.DOTALL)
+        # Canonical terminal objects, so parser lookups hash identical strings
+        self._names = {t: t for t in terminals}
+        self._byte_names = {t.encode('utf-8'): t for t in terminals}
+
+    @classmethod
+    def for_parser(cls, parser, skip=DEFAULT_SKIP):
+        """Lexer over the terminals of a CompiledParser ('$' excluded)."""
+        return cls(parser.symbols[1:parser.num_terminals], skip)
+
+    def tokens(self, text):
+        """Yield terminal names from a str, or from bytes/mmap decoded as UTF-8."""
+        for token, _, _ in self.spans(text):
+            yield token
+
+    def spans(self, text):
+        """Yield (terminal, start, end) triples."""
+        if isinstance(text, str):
+            names = self._names
+            for match in self.pattern.finditer(text):
+                group = match.lastindex
+                if group is not None:
+                    token = match.group(group)
+                    yield names.get(token, token), match.start(), match.end()
+        else:
+            names = self._byte_names
+            for match in self.bytes_pattern.finditer(text):
+                group = match.lastindex
+                if group is not None:
+                    token = match.group(group)
+                    name = names.get(token)
+                    if name is None:
+                        name = token.decode('utf-8', 'replace')
+                    yield name, match.start(), match.end()
+
+    def tokenize_file(self, path):
+        """Yield tokens from a file through a read-only memory map."""
+        with open(path, 'rb') as f:
+            try:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped
+                return
+            with buffer:
+                yield from self.tokens(buffer)
+
+    def tokenize_chunks(self, chunks):
+        """Yield tokens from an iterable of str chunks, e.g. a file object read in blocks."""
+        rest = ''
+        for chunk in chunks:
+            tokens, rest = self.split(rest + chunk)
+            yield from tokens
+        tokens, _ = self.split(rest, final=True)
+        yield from tokens
+
+    def split(self, buffer, final=False):
+        """Tokenize a buffer that may end mid-token; returns (tokens, unconsumed tail).
+
+        Unless final, matches starting within max_length of the end, and any
+        match (skipped text included) running to the end, are held back,
+        since more input could still extend them.
+        """
+        tokens = []
+        names = self._names
+        end = len(buffer)
+        limit = end - self.max_length
+        position = 0
+        for match in self.pattern.finditer(buffer):
+            if not final and (match.start() >= limit or match.end() == end):
+                return tokens, buffer[match.start():]
+            position = match.end()
+            group = match.lastindex
+            if group is not None:
+                token = match.group(group)
+                tokens.append(names.get(token, token))
+        return tokens, buffer[position:]
+
+def main():
+    from grammar_ir import GrammarIR
+    from pipeline import build_parser
+
+    grammar = GrammarIR.from_text('''
+    E -> E+T | T
+    T -> T*F | F
+    F -> (E) | id
+    ''', terminals=('id',))
+    _, _, parser = build_parser(grammar)
+    lexer = Lexer.for_parser(parser)
+
+    for text in ["id + id * id", "id*(id+id)", "id + + id", "id - id"]:
+        print(f"{text!r}: {list(lexer.tokens(text))} -> {parser.parse(lexer.tokens(text))}")
+
+    # With recovery every error is reported in one pass
+    text = "id + * id ) * id + (id id"
+    result = parser.parse(lexer.tokens(text), recover=True)
+    print(f"{text!r} with recovery:")
+    for error in result.errors:
+        print(f"  {error}")
+
+    # Streams are tokenized lazily, one block at a time
+    stream = io.StringIO("id + id * (id + id) + " * 1000 + "id")
+    blocks = iter(lambda: stream.read(7), '')
+    print(f"stream of 7-character blocks: {parser.parse(lexer.tokenize_chunks(blocks))}")
+
+if __name__ == "__main__":
+    main()
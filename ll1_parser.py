@@ -1,4 +1,17 @@
-from collections import defaultdict
+import time
+from array import array
+from collections import defaultdict, deque
+
+import instrumentation
+
+from grammar_analysis import GrammarAnalysis, strongly_connected_components
+from parse_table import CombTable, build_table, table_bytes
+
+END_MARKER = '$'
+EPSILON = 'ε'
+DEFAULT_MAX_ERRORS = 100
+DEFAULT_MAX_SKIPPED = 1000
+_END = object()
 
 class CFG:
     def __init__(self, grammar, start_symbol):
@@ -7,85 +20,102 @@ class CFG:
         self.productions = grammar
         self.first_sets = defaultdict(set)
         self.follow_sets = defaultdict(set)
+        self.analysis = None
+        self.conflicts = []
+        # Table behind plain parse() and CompiledParser behind parse(build_tree/recover),
+        # each built on first use
+        self._table = None
+        self._parser = None
     
     def calculate_first(self):
-        for non_terminal in self.productions:
-            self.first_sets[non_terminal] = self.get_first(non_terminal)
+        self._table = None
+        self._parser = None
+        self.analysis = GrammarAnalysis(self.productions, self.start_symbol, self.is_non_terminal)
+        self.analysis.compute_first()
+        self.first_sets.update(self.analysis.first_sets())
+        return self.first_sets
     
     def get_first(self, non_terminal):
-        if non_terminal in self.first_sets and self.first_sets[non_terminal]:
-            return self.first_sets[non_terminal]
-        
-        first_set = set()
-        for production in self.productions[non_terminal]:
-            for symbol in production:
-                if not self.is_non_terminal(symbol):  # Terminal symbol
-                    first_set.add(symbol)
-                    break
-                else:  # Non-terminal symbol
-                    first_set.update(self.get_first(symbol) - {'ε'})
-                    if 'ε' not in self.get_first(symbol):
-                        break
-            if all(self.is_non_terminal(symbol) and 'ε' in self.get_first(symbol) for symbol in production):
-                first_set.add('ε')
-        
-        self.first_sets[non_terminal] = first_set
-        return first_set
+        if self.analysis is None:
+            self.calculate_first()
+        return self.first_sets[non_terminal]
 
     def calculate_follow(self):
-        self.follow_sets[self.start_symbol].add('$')
-        changed = True
-        while changed:
-            changed = False
-            for head, bodies in self.productions.items():
-                for body in bodies:
-                    for i in range(len(body) - 1, -1, -1):
-                        symbol = body[i]
-                        if self.is_non_terminal(symbol):
-                            follow_size_before = len(self.follow_sets[symbol])
-                            if i == len(body) - 1:
-                                self.follow_sets[symbol].update(self.follow_sets[head])
-                            else:
-                                next_symbol_first = self.first_sets[body[i + 1]]
-                                self.follow_sets[symbol].update(next_symbol_first - {'ε'})
-                                if 'ε' in next_symbol_first:
-                                    self.follow_sets[symbol].update(self.follow_sets[head])
-                            if len(self.follow_sets[symbol]) > follow_size_before:
-                                changed = True
+        if self.analysis is None:
+            self.calculate_first()
+        self._table = None
+        self.analysis.compute_follow()
+        self.follow_sets.update(self.analysis.follow_sets())
         return self.follow_sets
     
     def is_non_terminal(self, symbol):
         return symbol.isupper()
 
-    def build_parsing_table(self):
+    def simplify(self, units=False):
+        """Drop non-generating and unreachable non-terminals (and, with units, unit productions).
+
+        FIRST/FOLLOW sets computed so far described the old grammar and are cleared.
+        """
+        from grammar_ir import GrammarIR
+        from grammar_simplify import simplify
+        grammar = GrammarIR.from_dict(self.productions, self.start_symbol, self.is_non_terminal)
+        # Bodies keep their shape: strings stay strings, symbol lists stay lists
+        strings = all(isinstance(body, str) for bodies in self.productions.values() for body in bodies)
+        grammar = simplify(grammar, units=units)
+        self.grammar = self.productions = {
+            head: [''.join(body) if strings else body for body in bodies]
+            for head, bodies in grammar.to_dict().items()
+        }
+        self.first_sets.clear()
+        self.follow_sets.clear()
+        self.analysis = None
+        self.conflicts = []
+        self._table = None
+        self._parser = None
+        return self
+
+    def build_parsing_table(self, strict=False):
+        """Build the predictive table, recording every LL(1) conflict.
+
+        Conflicting cells keep the last production, as before, and are
+        listed in self.conflicts. With strict, the first conflict raises
+        LL1ConflictError instead.
+        """
+        started = time.perf_counter()
         table = defaultdict(lambda: defaultdict(str))
+        sources = {}
+        conflicts = {}
         for non_terminal, productions in self.productions.items():
             for production in productions:
                 first_prod = self.get_first_of_production(production)
-                for terminal in first_prod:
-                    if terminal != 'ε':
-                        table[non_terminal][terminal] = production
+                cells = [(terminal, 'FIRST') for terminal in first_prod if terminal != 'ε']
                 if 'ε' in first_prod:
-                    for terminal in self.follow_sets[non_terminal]:
-                        if terminal != '$':
-                            table[non_terminal][terminal] = production
-                    if '$' in self.follow_sets[non_terminal]:
-                        table[non_terminal]['$'] = production
+                    cells.extend((terminal, 'FOLLOW') for terminal in self.follow_sets[non_terminal])
+                for terminal, source in cells:
+                    key = (non_terminal, terminal)
+                    existing = table[non_terminal].get(terminal)
+                    if existing is not None and existing != production:
+                        conflict = conflicts.get(key)
+                        if conflict is None:
+                            conflict = conflicts[key] = LL1Conflict(non_terminal, terminal,
+                                                                    [existing], {sources[key]})
+                        conflict.add(production, source)
+                        if strict:
+                            raise LL1ConflictError([conflict])
+                    table[non_terminal][terminal] = production
+                    sources[key] = source
+        self.conflicts = list(conflicts.values())
+        if instrumentation.hook is not None:
+            instrumentation.observe('table.seconds', time.perf_counter() - started)
+            instrumentation.count('table.cells', sum(len(row) for row in table.values()))
+            instrumentation.count('table.conflicts', len(self.conflicts))
         return table
 
     def get_first_of_production(self, production):
-        first_prod = set()
-        for symbol in production:
-            if not self.is_non_terminal(symbol):  # Terminal
-                first_prod.add(symbol)
-                break
-            else:
-                first_prod.update(self.first_sets[symbol] - {'ε'})
-                if 'ε' not in self.first_sets[symbol]:
-                    break
-        if all(self.is_non_terminal(symbol) and 'ε' in self.first_sets[symbol] for symbol in production):
-            first_prod.add('ε')
-        return first_prod
+        # Computed on the analysis bitsets, then decoded to terminal names
+        if self.analysis is None:
+            self.calculate_first()
+        return self.analysis.first_of(production)
 
     def print_sets(self):
         # Print the FIRST sets
@@ -100,6 +130,8 @@ class CFG:
     
     def print_parsing_table(self):
         table = self.build_parsing_table()
+        for conflict in self.conflicts:
+            print(f"Warning: {conflict}")
         print("\nPredictive Parsing Table:")
         terminals = sorted(set(t for rules in table.values() for t in rules.keys()))
         non_terminals = sorted(self.productions.keys())
@@ -108,43 +140,940 @@ class CFG:
             row = [non_terminal] + [table[non_terminal].get(t, '') for t in terminals]
             print(f"{row[0]:<10} {'  '.join(row[1:])}")
 
-    def parse(self, input_string):
+    def compile(self, strict=False, layout=None):
+        """Build the predictive table once and freeze it into a CompiledParser."""
+        if not self.first_sets:
+            self.calculate_first()
+        if not self.follow_sets:
+            self.calculate_follow()
+        return CompiledParser.from_cfg(self, self.build_parsing_table(strict), layout)
+
+    def freeze(self, strict=False, layout=None):
+        """Compile, then snapshot into an immutable FrozenGrammar that threads can share."""
+        from frozen_grammar import FrozenGrammar
+        return FrozenGrammar.from_cfg(self, strict, layout)
+
+    def parse(self, input_string, trace=None, build_tree=False, recover=False, **limits):
+        """Parse a string (or list of terminals) by cursor, without any I/O.
+
+        Returns a ParseResult. If trace is given it is called as
+        trace(event, position, symbol, detail) for every step. build_tree
+        and recover (with max_errors/max_skipped) parse with the compiled
+        table, see CompiledParser.parse. The table of either path is built
+        on the first such call and reused until simplify(), calculate_first()
+        or calculate_follow() runs again.
+        """
+        if build_tree or recover:
+            if self._parser is None:
+                self._parser = self.compile()
+            return self._parser.parse(input_string, trace, build_tree, recover, **limits)
+        if instrumentation.hook is not None and not isinstance(trace, _StepCounter):
+            return _measured(self.parse, input_string, trace)
+        if self._table is None:
+            self._table = self.build_parsing_table()
+        table = self._table
         stack = [self.start_symbol]
-        input_list = list(input_string) + ['$']  # Add the end-of-input symbol
-        print(f"Parsing input: {input_string}")
-        
+        length = len(input_string)
+        position = 0
+
         while stack:
             top = stack.pop()
-            current_input = input_list[0]
-            
-            print(f"Stack: {stack}")
-            print(f"Input: {input_list}")
-            
+            current_input = input_string[position] if position < length else END_MARKER
+
             if top == current_input:  # Terminal symbol matches input
-                print(f"Match: {top}")
-                input_list.pop(0)  # Move to the next input symbol
+                if trace is not None:
+                    trace('match', position, top, None)
+                position += 1
             elif self.is_non_terminal(top):  # Non-terminal symbol
-                table = self.build_parsing_table()
-                if current_input in table[top]:
-                    production = table[top][current_input]
-                    print(f"Expanding: {top} -> {production}")
-                    # Push the right-hand side of the production to the stack in reverse order
-                    for symbol in reversed(production):
-                        if symbol != 'ε':  # Don't push epsilon
-                            stack.append(symbol)
-                else:
-                    print("Error: No matching production found")
-                    return False
+                production = table[top].get(current_input) if top in table else None
+                if production is None:
+                    expected = tuple(sorted(table[top])) if top in table else ()
+                    return self._fail(trace, position, top, current_input, expected,
+                                      "No matching production found")
+                if trace is not None:
+                    trace('expand', position, top, production)
+                # Push the right-hand side of the production to the stack in reverse order
+                for symbol in reversed(production):
+                    if symbol != EPSILON:  # Don't push epsilon
+                        stack.append(symbol)
             else:
-                print("Error: Stack and input symbol mismatch")
-                return False
-        
-        if not input_list:
-            print("Parsing successful")
-            return True
+                return self._fail(trace, position, top, current_input, (top,),
+                                  "Stack and input symbol mismatch")
+
+        if position < length:
+            return self._fail(trace, position, END_MARKER, input_string[position], (END_MARKER,),
+                              "Input not fully consumed")
+        return ParseResult(True, position)
+
+    @staticmethod
+    def _fail(trace, position, top, token, expected, message):
+        if trace is not None:
+            trace('error', position, top, message)
+        return ParseResult(False, position, token, expected, message)
+
+class LL1Conflict:
+    """Two or more productions competing for the table cell M[non_terminal, terminal].
+
+    kind is 'FIRST/FIRST' when every production claims the terminal through
+    its FIRST set (or all are nullable), and 'FIRST/FOLLOW' when one claims
+    it through FIRST and another through FOLLOW of the non-terminal.
+    """
+    __slots__ = ('non_terminal', 'terminal', 'productions', 'sources')
+
+    def __init__(self, non_terminal, terminal, productions=(), sources=()):
+        self.non_terminal = non_terminal
+        self.terminal = terminal
+        self.productions = list(productions)
+        self.sources = set(sources)
+
+    def add(self, production, source):
+        if production not in self.productions:
+            self.productions.append(production)
+        self.sources.add(source)
+
+    @property
+    def kind(self):
+        return 'FIRST/FOLLOW' if len(self.sources) > 1 else 'FIRST/FIRST'
+
+    def __str__(self):
+        alternatives = ' | '.join(''.join(body) or EPSILON for body in self.productions)
+        return (f"{self.kind} conflict at M[{self.non_terminal}, {self.terminal}]: "
+                f"{self.non_terminal} -> {alternatives}")
+
+    __repr__ = __str__
+
+class LL1ConflictError(ValueError):
+    """Raised by strict table builds when the grammar is not LL(1)."""
+
+    def __init__(self, conflicts):
+        self.conflicts = list(conflicts)
+        super().__init__("grammar is not LL(1): " + "; ".join(str(c) for c in self.conflicts))
+
+class ParseResult:
+    """Outcome of a parse; truthy when the input was accepted.
+
+    On failure, position is the index of the offending token, token is that
+    token ('$' at end of input) and expected lists the terminals that would
+    have been accepted there. tree is the ParseTree when one was requested
+    and the input was accepted. A recovering parse lists every error found,
+    each as a failed ParseResult, in errors; the fields above describe the
+    first one.
+    """
+    __slots__ = ('accepted', 'position', 'token', 'expected', 'error', 'tree', 'errors')
+
+    def __init__(self, accepted, position, token=None, expected=(), error=None, tree=None, errors=()):
+        self.accepted = accepted
+        self.position = position
+        self.token = token
+        self.expected = expected
+        self.error = error
+        self.tree = tree
+        self.errors = errors
+
+    def __bool__(self):
+        return self.accepted
+
+    def __reduce__(self):
+        # Compact pickling for results sent back from worker processes
+        return (ParseResult, (self.accepted, self.position, self.token, self.expected, self.error,
+                              self.tree, self.errors))
+
+    def __repr__(self):
+        if self.accepted:
+            return f"ParseResult(accepted, tokens={self.position})"
+        more = f", {len(self.errors) - 1} more errors" if len(self.errors) > 1 else ""
+        return (f"ParseResult(rejected at {self.position}: {self.error}, "
+                f"got {self.token!r}, expected {list(self.expected)}{more})")
+
+class ParseTree:
+    """Parse tree stored column-wise in parallel int arrays, one slot per node.
+
+    Node 0 is the root. For node n: symbol[n] is its symbol ID in the
+    parser's numbering, production[n] the production expanding it (-1 for
+    terminals), parent[n], first_child[n] and next_sibling[n] link the
+    tree (-1 when absent), and start[n]:end[n] is the token span it covers.
+    Arrays are preallocated and doubled as needed; only the first size
+    slots are used.
+    """
+    COLUMNS = ('symbol', 'production', 'parent', 'first_child', 'next_sibling', 'start', 'end')
+
+    def __init__(self, symbols, capacity=1024):
+        self.symbols = symbols
+        self.size = 0
+        self.capacity = max(capacity, 1)
+        for column in self.COLUMNS:
+            setattr(self, column, array('i', bytes(4 * self.capacity)))
+
+    def _grow(self, needed):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        padding = bytes(4 * (capacity - self.capacity))
+        for column in self.COLUMNS:
+            getattr(self, column).frombytes(padding)
+        self.capacity = capacity
+
+    def __len__(self):
+        return self.size
+
+    def __reduce__(self):
+        return (_restore_tree, (self.symbols, self.size,
+                                *(getattr(self, column)[:self.size] for column in self.COLUMNS)))
+
+    def column(self, name):
+        """Zero-copy memoryview over the used part of one column."""
+        return memoryview(getattr(self, name))[:self.size]
+
+    def name(self, node):
+        return self.symbols[self.symbol[node]]
+
+    def span(self, node):
+        return self.start[node], self.end[node]
+
+    def children(self, node=0):
+        """Yield the child node IDs of node, left to right."""
+        child = self.first_child[node]
+        next_sibling = self.next_sibling
+        while child >= 0:
+            yield child
+            child = next_sibling[child]
+
+    def walk(self, node=0):
+        """Yield (node, depth) in preorder without building node objects."""
+        first_child = self.first_child
+        next_sibling = self.next_sibling
+        stack = [(node, 0)]
+        while stack:
+            node, depth = stack.pop()
+            yield node, depth
+            child = first_child[node]
+            if child >= 0:
+                # Siblings are read right to left so the leftmost is popped first
+                siblings = []
+                while child >= 0:
+                    siblings.append(child)
+                    child = next_sibling[child]
+                stack.extend((c, depth + 1) for c in reversed(siblings))
+
+    def leaves(self, node=0):
+        """Yield terminal node IDs under node in input order."""
+        production = self.production
+        for n, _ in self.walk(node):
+            if production[n] < 0:
+                yield n
+
+    def pretty(self, node=0):
+        lines = []
+        for n, depth in self.walk(node):
+            name = self.symbols[self.symbol[n]]
+            if self.production[n] >= 0 and self.first_child[n] < 0:
+                name += f" -> {EPSILON}"
+            lines.append(f"{'  ' * depth}{name} [{self.start[n]}:{self.end[n]}]")
+        return '\n'.join(lines)
+
+def _restore_tree(symbols, size, *columns):
+    tree = ParseTree(symbols, 1)
+    tree.size = tree.capacity = size
+    for name, values in zip(ParseTree.COLUMNS, columns):
+        setattr(tree, name, values)
+    return tree
+
+def print_trace(event, position, symbol, detail):
+    """Trace sink reproducing the old step-by-step parser output."""
+    if event == 'match':
+        print(f"[{position}] Match: {symbol}")
+    elif event == 'expand':
+        print(f"[{position}] Expanding: {symbol} -> {''.join(detail) or EPSILON}")
+    elif event == 'skip':
+        print(f"[{position}] Recovery: skip {symbol}")
+    elif event == 'pop':
+        print(f"[{position}] Recovery: pop {symbol}")
+    else:
+        print(f"[{position}] Error: {detail} (top of stack: {symbol})")
+
+class TraceBuffer:
+    """Bounded ring buffer trace sink keeping only the last maxlen steps."""
+
+    def __init__(self, maxlen=64):
+        self.events = deque(maxlen=maxlen)
+
+    def __call__(self, event, position, symbol, detail):
+        self.events.append((event, position, symbol, detail))
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def __len__(self):
+        return len(self.events)
+
+    def dump(self):
+        for step in self.events:
+            print_trace(*step)
+
+class CompiledParser:
+    """Immutable, integer-indexed LL(1) parser compiled once from a CFG.
+
+    Symbol IDs: 0 is the end marker '$', terminals follow, and every ID
+    >= num_terminals is a non-terminal. Production p has head prod_lhs[p]
+    and body prod_rhs[prod_offsets[p]:prod_offsets[p + 1]]. The predictive
+    table is one flat sequence indexed by (non_terminal - num_terminals) *
+    num_terminals + terminal, holding a production ID or -1 for an error;
+    from_cfg and from_ir store it dense or row-displaced (see parse_table),
+    whichever suits its density. conflicts lists the LL1Conflicts found
+    while the table was built (the last production won each cell).
+    """
+
+    def __init__(self, symbols, num_terminals, start, prod_lhs, prod_offsets, prod_rhs, table,
+                 sync=None, conflicts=()):
+        # table may be any int sequence, e.g. a memoryview over a cache file or a CombTable
+        self.symbols = tuple(symbols)
+        self.symbol_ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.num_terminals = num_terminals
+        # '$' is never a valid input token, only the implicit end of input
+        self.terminal_ids = {symbol: i for i, symbol in enumerate(self.symbols[1:num_terminals], 1)}
+        self.start = start
+        self.prod_lhs = tuple(prod_lhs)
+        self.prod_offsets = tuple(prod_offsets)
+        self.prod_rhs = tuple(prod_rhs)
+        self.table = table
+        # Error recovery synchronizes on FOLLOW(A) as a terminal bitmask per
+        # non-terminal, '$' always included; None when FOLLOW is not known
+        self.sync = tuple(sync) if sync is not None else None
+        self.conflicts = tuple(conflicts)
+
+        # Bodies reversed once, so an expansion is a single stack.extend()
+        self._push = tuple(
+            self.prod_rhs[self.prod_offsets[p]:self.prod_offsets[p + 1]][::-1]
+            for p in range(len(self.prod_lhs))
+        )
+
+    @classmethod
+    def from_cfg(cls, cfg, table=None, layout=None):
+        started = time.perf_counter()
+        if table is None:
+            table = cfg.build_parsing_table()
+
+        terminals = [END_MARKER]
+        non_terminals = list(cfg.productions)
+        seen = set(terminals) | set(non_terminals)
+        for bodies in cfg.productions.values():
+            for body in bodies:
+                for symbol in body:
+                    if symbol == EPSILON or symbol in seen:
+                        continue
+                    seen.add(symbol)
+                    if cfg.is_non_terminal(symbol):
+                        non_terminals.append(symbol)
+                    else:
+                        terminals.append(symbol)
+        symbols = terminals + non_terminals
+        symbol_ids = {symbol: i for i, symbol in enumerate(symbols)}
+
+        prod_lhs = []
+        prod_offsets = [0]
+        prod_rhs = []
+        production_ids = {}
+        for head, bodies in cfg.productions.items():
+            for body in bodies:
+                key = (head, tuple(body))
+                if key in production_ids:
+                    continue
+                production_ids[key] = len(prod_lhs)
+                prod_lhs.append(symbol_ids[head])
+                prod_rhs.extend(symbol_ids[s] for s in body if s != EPSILON)
+                prod_offsets.append(len(prod_rhs))
+
+        width = len(terminals)
+        cells = {}
+        for head, row in table.items():
+            base = (symbol_ids[head] - width) * width
+            for terminal, production in row.items():
+                # Empty bodies are valid ε productions, so look them up rather than test truthiness
+                production_id = production_ids.get((head, tuple(production)))
+                if production_id is not None:
+                    cells[base + symbol_ids[terminal]] = production_id
+
+        follow_sets = cfg.follow_sets() if callable(cfg.follow_sets) else cfg.follow_sets
+        _break_expansion_cycles(cells, width, prod_offsets, prod_rhs)
+        parser = cls(symbols, width, symbol_ids[cfg.start_symbol],
+                     prod_lhs, prod_offsets, prod_rhs,
+                     cls._table(cells, len(non_terminals), width, layout),
+                     cls.sync_sets(symbols, width, follow_sets), getattr(cfg, 'conflicts', ()))
+        instrumentation.observe('compile.seconds', time.perf_counter() - started)
+        return parser
+
+    @classmethod
+    def from_ir(cls, grammar, analysis=None, strict=False, layout=None):
+        """Compile a GrammarIR straight from its interned productions.
+
+        Symbol IDs follow the GrammarAnalysis numbering, so FIRST/FOLLOW bit
+        j is terminal ID j. Conflicting entries keep the last production,
+        as build_parsing_table does, and are listed in the parser's
+        conflicts; with strict the first one raises LL1ConflictError.
+        """
+        if analysis is None:
+            analysis = GrammarAnalysis.from_ir(grammar)
+        if analysis.follow is None:
+            analysis.compute_follow()
+        started = time.perf_counter()
+        width = len(analysis.terminals)
+        symbols = analysis.terminals + analysis.non_terminals
+
+        prod_lhs = []
+        prod_offsets = [0]
+        prod_rhs = []
+        cells = {}
+        competing = {}
+        for p, (head, body) in enumerate(analysis.productions):
+            prod_lhs.append(width + head)
+            prod_rhs.extend(-s - 1 if s < 0 else width + s for s in body)
+            prod_offsets.append(len(prod_rhs))
+            mask, nullable = analysis.first_of_encoded(body)
+            if nullable:
+                mask |= analysis.follow[head]
+            base = head * width
+            while mask:
+                low = mask & -mask
+                cell = base + low.bit_length() - 1
+                # A repeated alternative claims the same cells without competing
+                if cell in cells and analysis.productions[cells[cell]][1] != body:
+                    if strict:
+                        raise LL1ConflictError([cls._conflict(analysis, cell, width, cells[cell], p)])
+                    competing.setdefault(cell, [cells[cell]]).append(p)
+                cells[cell] = p
+                mask ^= low
+
+        conflicts = [cls._conflict(analysis, cell, width, *productions)
+                     for cell, productions in competing.items()]
+        _break_expansion_cycles(cells, width, prod_offsets, prod_rhs)
+        parser = cls(symbols, width, width + analysis.nt_ids[analysis.start_symbol],
+                     prod_lhs, prod_offsets, prod_rhs,
+                     cls._table(cells, len(analysis.non_terminals), width, layout),
+                     [follow | 1 for follow in analysis.follow], conflicts)
+        instrumentation.count('compile.conflicts', len(conflicts))
+        instrumentation.observe('compile.seconds', time.perf_counter() - started)
+        return parser
+
+    @staticmethod
+    def _table(cells, rows, width, layout):
+        table = build_table(cells, rows, width, layout)
+        instrumentation.observe('compile.table_bytes', table_bytes(table))
+        return table
+
+    @staticmethod
+    def sync_sets(symbols, num_terminals, follow_sets):
+        """Synchronization bitmasks per non-terminal from {name: FOLLOW names}."""
+        ids = {symbol: i for i, symbol in enumerate(symbols[:num_terminals])}
+        sync = []
+        for symbol in symbols[num_terminals:]:
+            mask = 1
+            for terminal in follow_sets.get(symbol, ()):
+                if terminal in ids:
+                    mask |= 1 << ids[terminal]
+            sync.append(mask)
+        return sync
+
+    @staticmethod
+    def _conflict(analysis, cell, width, *productions):
+        head, terminal = divmod(cell, width)
+        conflict = LL1Conflict(analysis.non_terminals[head], analysis.terminals[terminal])
+        for p in productions:
+            body = analysis.productions[p][1]
+            mask, nullable = analysis.first_of_encoded(body)
+            names = tuple(analysis.non_terminals[s] if s >= 0 else analysis.terminals[-s - 1]
+                          for s in body)
+            conflict.add(names,
+                         'FIRST' if mask >> terminal & 1 else 'FOLLOW')
+        return conflict
+
+    def __reduce__(self):
+        table = self.table
+        if not isinstance(table, CombTable):
+            # memoryviews (cache-backed tables) do not pickle
+            table = array('i', table)
+        return (CompiledParser, (self.symbols, self.num_terminals, self.start, self.prod_lhs,
+                                 self.prod_offsets, self.prod_rhs, table, self.sync, self.conflicts))
+
+    def production(self, production_id):
+        """Return (head, body) of a production as symbol names."""
+        start, end = self.prod_offsets[production_id], self.prod_offsets[production_id + 1]
+        return (self.symbols[self.prod_lhs[production_id]],
+                tuple(self.symbols[s] for s in self.prod_rhs[start:end]))
+
+    def expected(self, symbol):
+        """Terminal names acceptable when symbol (an ID) is on top of the stack."""
+        width = self.num_terminals
+        if symbol < width:
+            return (self.symbols[symbol],)
+        base = (symbol - width) * width
+        return tuple(self.symbols[t] for t in range(width) if self.table[base + t] >= 0)
+
+    def parse(self, tokens, trace=None, build_tree=False, recover=False,
+              max_errors=DEFAULT_MAX_ERRORS, max_skipped=DEFAULT_MAX_SKIPPED):
+        """Parse a string or any iterable of terminals; returns a ParseResult.
+
+        Tokens are consumed by a single forward pass and nothing is printed.
+        If trace is given it is called as trace(event, position, symbol, detail).
+        With build_tree, an accepted result carries a ParseTree in result.tree.
+        With recover, parsing continues past errors (see _parse_recovering).
+        """
+        if instrumentation.hook is not None and not isinstance(trace, _StepCounter):
+            return self._parse_measured(tokens, trace, build_tree, recover, max_errors, max_skipped)
+        if recover:
+            if build_tree:
+                raise ValueError("build_tree cannot be combined with recover")
+            return self._parse_recovering(tokens, trace, max_errors, max_skipped)
+        if build_tree:
+            return self._parse_tree(tokens, trace)
+        stack = [0, self.start]
+        position, failure = self._consume(stack, tokens, 0, trace)
+        if failure is not None:
+            return failure
+        return self._finish(stack, position, trace)
+
+    def _parse_measured(self, tokens, trace, *options):
+        return _measured(self.parse, tokens, trace, *options)
+
+    def _parse_tree(self, tokens, trace):
+        # Same loop as _consume/_finish, with a node ID stack parallel to the symbol stack
+        table = self.table
+        width = self.num_terminals
+        terminal_ids = self.terminal_ids
+        prod_offsets = self.prod_offsets
+        prod_rhs = self.prod_rhs
+        push = self._push
+        bodies = tuple(prod_rhs[prod_offsets[p]:prod_offsets[p + 1]] for p in range(len(push)))
+
+        capacity = 2 * len(tokens) + 16 if hasattr(tokens, '__len__') else 1024
+        tree = ParseTree(self.symbols, capacity)
+        symbol, production_of, parent = tree.symbol, tree.production, tree.parent
+        first_child, next_sibling = tree.first_child, tree.next_sibling
+        start, end = tree.start, tree.end
+        symbol[0] = self.start
+        parent[0] = -1
+        size = 1
+
+        stack = [0, self.start]
+        nodes = [-1, 0]
+        position = 0
+        tokens = iter(tokens)
+        token = next(tokens, _END)
+        terminal = 0 if token is _END else terminal_ids.get(token, -1)
+        while True:
+            if terminal < 0:
+                return self._fail(trace, position, stack[-1], token, "Unknown terminal")
+            if token is _END:
+                token = END_MARKER
+            top = stack.pop()
+            node = nodes.pop()
+            if top == terminal:
+                if top == 0:
+                    break
+                start[node] = position
+                end[node] = position + 1
+                production_of[node] = first_child[node] = -1
+                if trace is not None:
+                    trace('match', position, token, None)
+                position += 1
+                token = next(tokens, _END)
+                terminal = 0 if token is _END else terminal_ids.get(token, -1)
+                continue
+            if top < width:
+                stack.append(top)
+                message = "Unexpected end of input" if terminal == 0 else "Stack and input symbol mismatch"
+                return self._fail(trace, position, top, token, message)
+            production = table[(top - width) * width + terminal]
+            if production < 0:
+                stack.append(top)
+                message = "Unexpected end of input" if terminal == 0 else "No matching production found"
+                return self._fail(trace, position, top, token, message)
+            if trace is not None:
+                trace('expand', position, self.symbols[top], self.production(production)[1])
+
+            count = prod_offsets[production + 1] - prod_offsets[production]
+            production_of[node] = production
+            start[node] = end[node] = position
+            if size + count > tree.capacity:
+                tree._grow(size + count)
+            if count:
+                first_child[node] = size
+                last = size + count
+                for i, s in enumerate(bodies[production], size):
+                    symbol[i] = s
+                    parent[i] = node
+                    next_sibling[i] = i + 1
+                next_sibling[last - 1] = -1
+                stack.extend(push[production])
+                nodes.extend(range(last - 1, size - 1, -1))
+                size = last
+            else:
+                first_child[node] = -1
+
+        # Children always have higher IDs than their parent, so one backward
+        # sweep extends every span to cover its subtree
+        for node in range(size - 1, 0, -1):
+            if end[node] > end[parent[node]]:
+                end[parent[node]] = end[node]
+        tree.size = size
+        return ParseResult(True, position, tree=tree)
+
+    def _parse_recovering(self, tokens, trace, max_errors, max_skipped):
+        # Panic mode: a missing terminal is assumed inserted and popped; a
+        # non-terminal with no entry is popped when the token is in its sync
+        # set (FOLLOW plus '$'), otherwise the token is skipped. Input left
+        # over after a complete sentence is parsed as a new one. Only the first
+        # error of a burst is reported, until a token matches again. Pops
+        # can expose expansions that loop without consuming input, so while
+        # recovering the steps taken on one token are capped at (stack depth
+        # + non-terminals) * (longest body + 1); past that, or after
+        # max_errors errors or max_skipped skips, the pass stops early.
+        table = self.table
+        push = self._push
+        width = self.num_terminals
+        terminal_ids = self.terminal_ids
+        sync = self.sync
+        if sync is None:
+            sync = [1] * (len(self.symbols) - width)
+
+        errors = []
+        skipped = 0
+        restarted = -1
+        recovering = False
+        idle = 0
+        idle_limit = 0
+        rows = len(self.symbols) - width
+        span = max(map(len, push), default=0) + 1
+        stack = [0, self.start]
+        pop = stack.pop
+        extend = stack.extend
+        position = 0
+        tokens = iter(tokens)
+        token = next(tokens, _END)
+        terminal = 0 if token is _END else terminal_ids.get(token, -1)
+        if token is _END:
+            token = END_MARKER
+
+        def error(top, message):
+            # Records the error; True once max_errors have been reported
+            if not recovering:
+                errors.append(self._fail(trace, position, top, token, message))
+            return len(errors) >= max_errors
+
+        def stalled():
+            # Counts a recovery step that consumed nothing; True past the budget
+            nonlocal idle, idle_limit
+            if idle == 0:
+                idle_limit = (len(stack) + rows) * span
+            idle += 1
+            return idle > idle_limit
+
+        stopped = "Too many errors"
+
+        while True:
+            top = stack[-1]
+            if top == terminal:
+                if top == 0:
+                    stopped = None
+                    break
+                pop()
+                recovering = False
+                if trace is not None:
+                    trace('match', position, token, None)
+            elif top == 0 and terminal > 0 and restarted != position and \
+                    table[(self.start - width) * width + terminal] >= 0:
+                # Trailing input that can begin a sentence is parsed as one, so
+                # errors after it are still found; at most once per position
+                if error(top, "Stack and input symbol mismatch"):
+                    break
+                recovering = True
+                restarted = position
+                extend((self.start,))
+                continue
+            elif terminal < 0 or top == 0:
+                message = "Unknown terminal" if terminal < 0 else "Stack and input symbol mismatch"
+                if error(top, message):
+                    break
+                if skipped >= max_skipped:
+                    stopped = "Too many skipped tokens"
+                    break
+                recovering = True
+                skipped += 1
+                if trace is not None:
+                    trace('skip', position, token, None)
+            elif top < width:
+                message = "Unexpected end of input" if terminal == 0 else "Stack and input symbol mismatch"
+                if error(top, message):
+                    break
+                recovering = True
+                if stalled():
+                    stopped = "Too many steps without consuming input"
+                    break
+                pop()
+                if trace is not None:
+                    trace('pop', position, self.symbols[top], None)
+                continue
+            else:
+                production = table[(top - width) * width + terminal]
+                if production >= 0:
+                    if recovering and stalled():
+                        stopped = "Too many steps without consuming input"
+                        break
+                    pop()
+                    if trace is not None:
+                        trace('expand', position, self.symbols[top], self.production(production)[1])
+                    extend(push[production])
+                    continue
+                message = "Unexpected end of input" if terminal == 0 else "No matching production found"
+                if error(top, message):
+                    break
+                recovering = True
+                if sync[top - width] >> terminal & 1:
+                    if stalled():
+                        stopped = "Too many steps without consuming input"
+                        break
+                    pop()
+                    if trace is not None:
+                        trace('pop', position, self.symbols[top], None)
+                    continue
+                if skipped >= max_skipped:
+                    stopped = "Too many skipped tokens"
+                    break
+                skipped += 1
+                if trace is not None:
+                    trace('skip', position, token, None)
+            # The current token was matched or skipped
+            idle = 0
+            position += 1
+            token = next(tokens, _END)
+            terminal = 0 if token is _END else terminal_ids.get(token, -1)
+            if token is _END:
+                token = END_MARKER
+
+        if not errors:
+            return ParseResult(True, position)
+        if stopped is not None:
+            # The pass ended early; say so instead of reporting a partial list silently
+            errors.append(ParseResult(False, position, token, (), f"{stopped}, parsing stopped"))
+        first = errors[0]
+        return ParseResult(False, first.position, first.token, first.expected, first.error,
+                           errors=errors)
+
+    def session(self, lexer=None, trace=None):
+        """Start a push-style ParseSession; with a lexer, feed() takes text chunks."""
+        return ParseSession(self, lexer, trace)
+
+    def _consume(self, stack, tokens, position, trace):
+        # Returns (position, None) after the tokens, or (position, failed ParseResult)
+        table = self.table
+        push = self._push
+        width = self.num_terminals
+        terminal_ids = self.terminal_ids
+        pop = stack.pop
+        extend = stack.extend
+
+        for token in tokens:
+            terminal = terminal_ids.get(token, -1)
+            if terminal < 0:
+                return position, self._fail(trace, position, stack[-1], token, "Unknown terminal")
+            while True:
+                top = pop()
+                if top == terminal:
+                    break
+                if top < width:
+                    stack.append(top)
+                    return position, self._fail(trace, position, top, token,
+                                                "Stack and input symbol mismatch")
+                production = table[(top - width) * width + terminal]
+                if production < 0:
+                    stack.append(top)
+                    return position, self._fail(trace, position, top, token,
+                                                "No matching production found")
+                if trace is not None:
+                    trace('expand', position, self.symbols[top], self.production(production)[1])
+                extend(push[production])
+            if trace is not None:
+                trace('match', position, token, None)
+            position += 1
+        return position, None
+
+    def _finish(self, stack, position, trace):
+        # End of input: only ε-expansions may remain before the '$' marker
+        table = self.table
+        width = self.num_terminals
+        while True:
+            top = stack.pop()
+            if top == 0:
+                return ParseResult(True, position)
+            if top < width:
+                stack.append(top)
+                return self._fail(trace, position, top, END_MARKER, "Unexpected end of input")
+            production = table[(top - width) * width]
+            if production < 0:
+                stack.append(top)
+                return self._fail(trace, position, top, END_MARKER, "Unexpected end of input")
+            if trace is not None:
+                trace('expand', position, self.symbols[top], self.production(production)[1])
+            stack.extend(self._push[production])
+
+    def _fail(self, trace, position, top, token, message):
+        if trace is not None:
+            trace('error', position, self.symbols[top], message)
+        return ParseResult(False, position, token, self.expected(top), message)
+
+class _StepCounter:
+    """Trace sink counting parser steps, forwarding them to another trace if given."""
+    __slots__ = ('trace', 'matches', 'expansions', 'other')
+
+    def __init__(self, trace=None):
+        self.trace = trace
+        self.matches = 0
+        self.expansions = 0
+        self.other = 0
+
+    def __call__(self, event, position, symbol, detail):
+        if event == 'match':
+            self.matches += 1
+        elif event == 'expand':
+            self.expansions += 1
         else:
-            print("Error: Input not fully consumed")
-            return False
+            self.other += 1
+        if self.trace is not None:
+            self.trace(event, position, symbol, detail)
+
+def _measured(parse, tokens, trace, *options):
+    # Metrics are enabled: count steps through the trace hook
+    counter = _StepCounter(trace)
+    started = time.perf_counter()
+    result = parse(tokens, counter, *options)
+    seconds = time.perf_counter() - started
+    instrumentation.count('parse.calls')
+    instrumentation.count('parse.accepted' if result.accepted else 'parse.rejected')
+    instrumentation.count('parse.tokens', counter.matches)
+    instrumentation.count('parse.expansions', counter.expansions)
+    instrumentation.count('parse.steps', counter.matches + counter.expansions + counter.other)
+    instrumentation.observe('parse.expansions_per_token', counter.expansions / max(counter.matches, 1))
+    instrumentation.observe('parse.seconds', seconds)
+    return result
+
+def _break_expansion_cycles(table, width, prod_offsets, prod_rhs):
+    """Remove entries of {cell: production} from which the parser would expand forever.
+
+    A cell (A, t) leads to (X, t) when the chosen body reaches X before
+    consuming t, i.e. everything left of X vanishes under lookahead t. Such
+    moves are deterministic, so a cycle among them (only possible with a
+    left-recursive, hence conflicting, grammar) never terminates; those
+    cells become errors. Returns the number of cells cleared.
+    """
+    cells = sorted(table)
+    index = {cell: i for i, cell in enumerate(cells)}
+
+    def body(cell):
+        p = table[cell]
+        return prod_rhs[prod_offsets[p]:prod_offsets[p + 1]]
+
+    def target(cell, symbol):
+        # Cell reached when symbol is on top with the same lookahead, or None
+        if symbol < width:
+            return None
+        reached = (symbol - width) * width + cell % width
+        return reached if reached in table else None
+
+    # Cells whose expansion vanishes entirely: counting worklist
+    vanish = set()
+    waiting = {}
+    worklist = []
+    for cell in cells:
+        targets = [target(cell, symbol) for symbol in body(cell)]
+        if None in targets:
+            continue
+        if not targets:
+            vanish.add(cell)
+            worklist.append(cell)
+            continue
+        entry = [len(targets), cell]
+        for reached in targets:
+            waiting.setdefault(reached, []).append(entry)
+    while worklist:
+        for entry in waiting.get(worklist.pop(), ()):
+            entry[0] -= 1
+            if entry[0] == 0 and entry[1] not in vanish:
+                vanish.add(entry[1])
+                worklist.append(entry[1])
+
+    successors = [[] for _ in cells]
+    for i, cell in enumerate(cells):
+        for symbol in body(cell):
+            reached = target(cell, symbol)
+            if reached is None:
+                break
+            successors[i].append(index[reached])
+            if reached not in vanish:
+                break
+
+    cleared = 0
+    for component in strongly_connected_components(successors):
+        if len(component) > 1 or component[0] in successors[component[0]]:
+            for i in component:
+                del table[cells[i]]
+                cleared += 1
+    instrumentation.count('compile.cells', len(cells))
+    instrumentation.count('compile.cycle_cells_cleared', cleared)
+    return cleared
+
+class ParseSession:
+    """Incremental parse of input that arrives in pieces.
+
+    Between calls only the LL(1) stack, the token count and (with a lexer)
+    the unfinished tail of the last chunk are kept, so memory does not grow
+    with the input. feed() returns False once the input is known to be
+    rejected; finish() returns the ParseResult, after which feed() raises
+    RuntimeError.
+    """
+
+    def __init__(self, parser, lexer=None, trace=None):
+        self.parser = parser
+        self.lexer = lexer
+        self.trace = trace
+        self.stack = [0, parser.start]
+        self.position = 0
+        self.result = None
+        self.finished = False
+        self._rest = ''
+
+    def feed(self, chunk):
+        """Consume a text chunk (with a lexer) or an iterable of terminals."""
+        if self.finished:
+            raise RuntimeError("session already finished")
+        if self.result is not None:
+            return self.result.accepted
+        if self.lexer is not None:
+            chunk, self._rest = self.lexer.split(self._rest + chunk)
+        self.position, self.result = self.parser._consume(self.stack, chunk, self.position, self.trace)
+        return self.result is None
+
+    def finish(self):
+        if self.result is None and self.lexer is not None and self._rest:
+            tokens, self._rest = self.lexer.split(self._rest, final=True)
+            self.position, self.result = self.parser._consume(
+                self.stack, tokens, self.position, self.trace)
+        if self.result is None:
+            self.result = self.parser._finish(self.stack, self.position, self.trace)
+        self.finished = True
+        return self.result
+
+    async def feed_async(self, chunk):
+        """feed(), then yield to the event loop so other tasks keep running."""
+        import asyncio
+        accepted = self.feed(chunk)
+        await asyncio.sleep(0)
+        return accepted
+
+    async def parse_async(self, chunks):
+        """Feed every chunk of an async iterable, then finish()."""
+        async for chunk in chunks:
+            if not await self.feed_async(chunk):
+                break
+        return self.finish()
 
 def main():
     # Define the grammar
@@ -156,9 +1085,10 @@ def main():
     start_symbol = 'S'
     cfg = CFG(productions, start_symbol)
     
-    # Calculate FIRST and FOLLOW sets
-    cfg.calculate_first()
-    cfg.calculate_follow()
+    # Calculate FIRST and FOLLOW sets and compile the table, or load them
+    # from the on-disk cache if this grammar was analyzed before
+    from grammar_cache import GrammarCache
+    parser = GrammarCache().compile(cfg)
 
     # Print FIRST and FOLLOW sets
     cfg.print_sets()
@@ -168,7 +1098,34 @@ def main():
 
     # Parse the input string
     input_string = "ab"
-    cfg.parse(input_string)
+    print(f"\nParsing input: {input_string}")
+    print(cfg.parse(input_string, trace=print_trace))
+
+    # Reuse the compiled table for every further input; keep a short
+    # trace only so that failures can be explained
+    for text in ["ab", "aaab", "b", "ba"]:
+        trace = TraceBuffer(maxlen=4)
+        result = parser.parse(text, trace=trace)
+        print(f"{text}: {result}")
+        if not result:
+            trace.dump()
+
+    # Parse tree in flat arrays, walked without per-node objects
+    result = parser.parse("aab", build_tree=True)
+    print(f"\nParse tree of 'aab' ({len(result.tree)} nodes):")
+    print(result.tree.pretty())
+
+    # Error recovery reports every error in one pass, synchronizing on FOLLOW
+    result = parser.parse("abab", recover=True)
+    print(f"\nabab with recovery: {result}")
+    for error in result.errors:
+        print(f"  {error}")
+
+    # Push-style session: input arrives in pieces and only the stack is kept
+    session = parser.session()
+    for chunk in ["a", "aa", "", "ab"]:
+        session.feed(chunk)
+    print(f"session fed 'a', 'aa', '', 'ab': {session.finish()}")
 
 if __name__ == "__main__":
     main()
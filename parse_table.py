@@ -0,0 +1,156 @@
+import sys
+from array import array
+
+# Production IDs are stored as C ints; -1 marks an error entry in every layout
+EMPTY = -1
+# Below this fraction of filled cells a table is stored row-displaced ...
+COMB_DENSITY = 0.25
+# ... unless it is small enough that the dense copy costs nothing
+COMB_MIN_CELLS = 4096
+
+class CombTable:
+    """Row-displacement ("comb") compressed predictive table.
+
+    Every row's entries are slid into one shared value array at offset
+    base[row], so that no two rows collide; check[slot] records which row
+    owns a slot. Indexing is the same as for the dense layout, table[row *
+    width + terminal], and costs two array reads whatever the grammar size.
+    base, check and value may be any int sequences, e.g. memoryviews over
+    a cache file.
+    """
+
+    __slots__ = ('width', 'rows', 'base', 'check', 'value')
+
+    def __init__(self, width, rows, base, check, value):
+        self.width = width
+        self.rows = rows
+        self.base = base
+        self.check = check
+        self.value = value
+
+    @classmethod
+    def compress(cls, cells, rows, width):
+        """Pack {cell: production} by first fit, fullest rows first."""
+        columns = [[] for _ in range(rows)]
+        for cell in cells:
+            row, terminal = divmod(cell, width)
+            columns[row].append(terminal)
+        base = array('i', [0]) * rows
+        check = array('i', [EMPTY]) * width
+        value = array('i', [EMPTY]) * width
+        # Bit i set when slot i is free; slots past the end are free too
+        free = (1 << width) - 1
+        tail = (1 << width) - 1
+        for row in sorted(range(rows), key=lambda r: -len(columns[r])):
+            terminals = columns[row]
+            if not terminals:
+                break
+            # Offsets where every entry lands on a free slot: one shifted AND per entry
+            padded = free | tail << len(check)
+            fits = padded
+            for t in terminals:
+                fits &= padded >> t
+            offset = (fits & -fits).bit_length() - 1
+            # Keep width slots past every base, so no lookup runs off the end
+            missing = offset + width - len(check)
+            if missing > 0:
+                free |= ((1 << missing) - 1) << len(check)
+                check.extend(array('i', [EMPTY]) * missing)
+                value.extend(array('i', [EMPTY]) * missing)
+            row_base = row * width
+            for t in terminals:
+                check[offset + t] = row
+                value[offset + t] = cells[row_base + t]
+                free &= ~(1 << offset + t)
+            base[row] = offset
+        return cls(width, rows, base, check, value)
+
+    def __getitem__(self, index):
+        row, terminal = divmod(index, self.width)
+        slot = self.base[row] + terminal
+        return self.value[slot] if self.check[slot] == row else EMPTY
+
+    def __len__(self):
+        return self.rows * self.width
+
+    def __iter__(self):
+        # Dense expansion, so list(table) is the same for either layout
+        cells = array('i', [EMPTY]) * len(self)
+        for cell, production in self.entries():
+            cells[cell] = production
+        return iter(cells)
+
+    def __reduce__(self):
+        return (CombTable, (self.width, self.rows, array('i', self.base),
+                            array('i', self.check), array('i', self.value)))
+
+    def entries(self):
+        """(cell, production) for every non-error entry, in slot order."""
+        width = self.width
+        base = self.base
+        value = self.value
+        for slot, row in enumerate(self.check):
+            if row >= 0:
+                yield row * width + slot - base[row], value[slot]
+
+    @property
+    def nbytes(self):
+        return sum(len(a) * 4 for a in (self.base, self.check, self.value))
+
+def dense_table(cells, size):
+    """Flat C-int array of size cells, -1 except for {cell: production}."""
+    table = array('i', [EMPTY]) * size
+    for cell, production in cells.items():
+        table[cell] = production
+    return table
+
+def build_table(cells, rows, width, layout=None):
+    """Parse table holding {cell: production} for rows x width cells.
+
+    layout is 'dense', 'comb', or None to pick comb for large tables whose
+    filled fraction is below COMB_DENSITY. Both layouts are indexed as
+    table[row * width + terminal] and give -1 for an error.
+    """
+    size = rows * width
+    if layout is None:
+        sparse = size >= COMB_MIN_CELLS and len(cells) < COMB_DENSITY * size
+        layout = 'comb' if sparse else 'dense'
+    if layout == 'comb':
+        return CombTable.compress(cells, rows, width)
+    if layout == 'dense':
+        return dense_table(cells, size)
+    raise ValueError(f"unknown parse table layout {layout!r}")
+
+def table_layout(table):
+    return 'comb' if isinstance(table, CombTable) else 'dense'
+
+def entries(table):
+    """(cell, production) for every non-error entry of a table in any layout."""
+    if isinstance(table, CombTable):
+        return table.entries()
+    return ((cell, production) for cell, production in enumerate(table) if production >= 0)
+
+def table_bytes(table):
+    if isinstance(table, CombTable):
+        return table.nbytes
+    if isinstance(table, (array, memoryview)):
+        return len(table) * table.itemsize
+    return sys.getsizeof(table)
+
+def main():
+    import random
+
+    rng = random.Random(0)
+    rows, width = 2000, 500
+    cells = {}
+    for row in range(rows):
+        for terminal in rng.sample(range(width), rng.randint(1, 12)):
+            cells[row * width + terminal] = rng.randrange(10000)
+    dense = build_table(cells, rows, width, 'dense')
+    comb = build_table(cells, rows, width)
+    assert all(comb[i] == dense[i] for i in range(len(dense)))
+    print(f"{len(cells)} entries in {rows} x {width} cells: dense {table_bytes(dense)} bytes, "
+          f"{table_layout(comb)} {table_bytes(comb)} bytes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+import hashlib
+import importlib.util
+import json
+import os
+import random
+import threading
+import time
+import weakref
+from array import array
+
+from grammar_cache import DEFAULT_MAX_BYTES, MODULE_PREFIX, GrammarCache, default_cache_dir
+from ll1_parser import CFG
+from parse_table import CombTable, entries
+
+GENERATOR_VERSION = 2
+
+# Expansion chains longer than this are left to the generated loop
+MAX_CHAIN = 64
+
+_TEMPLATE = '''\
+# Generated by parser_codegen.py (version {version}); do not edit.
+from ll1_parser import ParseResult
+
+KEY = {key!r}
+SYMBOLS = {symbols!r}
+TERMINALS = {terminals!r}
+WIDTH = {width}
+START = {start}
+# STEPS[symbol * WIDTH + terminal]: stack suffix (reversed) after all expansions
+# up to the next terminal; missing where the parser must fail; terminal 0 is '$'
+STEPS = {steps!r}
+# MATCHES[symbol * WIDTH + terminal]: the same suffix when that next terminal is
+# the lookahead itself, which is then matched at once
+MATCHES = {matches!r}
+# EXPECTED[symbol]: terminal names with an entry, for non-terminals only
+EXPECTED = {expected!r}
+
+def _fail(position, top, token, message):
+    expected = (SYMBOLS[top],) if top < WIDTH else EXPECTED.get(top, ())
+    return ParseResult(False, position, token, expected, message)
+
+def parse(tokens):
+    stack = [0, START]
+    pop = stack.pop
+    extend = stack.extend
+    get_terminal = TERMINALS.get
+    get_match = MATCHES.get
+    get_step = STEPS.get
+    position = 0
+    for token in tokens:
+        terminal = get_terminal(token, -1)
+        if terminal < 0:
+            return _fail(position, stack[-1], token, "Unknown terminal")
+        while True:
+            top = pop()
+            if top == terminal:
+                break
+            index = top * WIDTH + terminal
+            step = get_match(index)
+            if step is not None:
+                extend(step)
+                break
+            step = get_step(index)
+            if step is None:
+                if top < WIDTH:
+                    return _fail(position, top, token, "Stack and input symbol mismatch")
+                return _fail(position, top, token, "No matching production found")
+            extend(step)
+        position += 1
+    while True:
+        top = pop()
+        if top == 0:
+            return ParseResult(True, position)
+        step = get_step(top * WIDTH)
+        if step is None:
+            return _fail(position, top, '$', "Unexpected end of input")
+        extend(step)
+'''
+
+# Keys already computed, per parser instance
+_keys = weakref.WeakKeyDictionary()
+
+def parser_key(parser):
+    """Content hash of a compiled parser, naming its generated module.
+
+    The table is hashed in its stored layout as raw int32 bytes (the comb
+    base/check/value arrays for a CombTable), never densified, and the key
+    is remembered for the parser instance.
+    """
+    key = _keys.get(parser)
+    if key is not None:
+        return key
+    digest = hashlib.sha256(json.dumps(
+        [GENERATOR_VERSION, parser.symbols, parser.num_terminals, parser.start,
+         parser.prod_lhs, parser.prod_offsets, parser.prod_rhs],
+        ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    table = parser.table
+    if isinstance(table, CombTable):
+        digest.update(b'comb')
+        parts = (table.base, table.check, table.value)
+    else:
+        digest.update(b'dense')
+        parts = (table,)
+    for part in parts:
+        digest.update(part.tobytes() if isinstance(part, (array, memoryview))
+                      else array('i', part).tobytes())
+    key = _keys[parser] = digest.hexdigest()[:32]
+    return key
+
+def expansion_steps(parser):
+    """STEPS as {symbol * width + terminal: suffix}: each expansion chain collapsed into one push.
+
+    Starting from non-terminal A with lookahead t, the parser deterministically
+    expands until a terminal is on top or a non-terminal has no entry; the
+    stack suffix left at that point is pushed at once. If the chain empties
+    its own suffix (A derives ε under t), the suffix is empty too. Only
+    table entries get a step, so the size follows the table's, not
+    symbols x terminals.
+    """
+    width = parser.num_terminals
+    table = parser.table
+    push = parser._push
+    steps = {}
+    for cell, production in entries(table):
+        terminal = cell % width
+        suffix = list(push[production])
+        for _ in range(MAX_CHAIN):
+            if not suffix or suffix[-1] < width:
+                break
+            top = suffix[-1]
+            production = table[(top - width) * width + terminal]
+            if production < 0:
+                break
+            suffix.pop()
+            suffix.extend(push[production])
+        steps[(cell // width + width) * width + terminal] = tuple(suffix)
+    return steps
+
+def generate_source(parser):
+    """Python source of a module whose parse(tokens) behaves like parser.parse."""
+    if isinstance(parser, CFG):
+        parser = parser.compile()
+    width = parser.num_terminals
+    steps = expansion_steps(parser)
+    expected = {}
+    for cell, _ in entries(parser.table):
+        expected.setdefault(cell // width + width, []).append(cell % width)
+    return _TEMPLATE.format(
+        version=GENERATOR_VERSION,
+        key=parser_key(parser),
+        symbols=parser.symbols,
+        terminals=dict(parser.terminal_ids),
+        width=width,
+        start=parser.start,
+        steps=steps,
+        matches={index: step[:-1] for index, step in steps.items()
+                 if step and step[-1] == index % width},
+        expected={symbol: tuple(parser.symbols[t] for t in sorted(terminals))
+                  for symbol, terminals in expected.items()},
+    )
+
+# Loaded modules by key, so each grammar is imported once per process; the
+# lock keeps threads from generating or importing the same module twice
+_modules = {}
+_modules_lock = threading.Lock()
+
+def load_parser_module(parser, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+    """Generate (or reuse) the module for parser on disk and import it.
+
+    Modules are written to directory (the grammar cache directory by default)
+    as ll1_generated_<key>.py, so later processes import the existing file.
+    They are evicted together with the cache entries there, least recently
+    used first, to keep the directory under max_bytes.
+    """
+    if isinstance(parser, CFG):
+        parser = parser.compile()
+    key = parser_key(parser)
+    module = _modules.get(key)
+    if module is not None:
+        return module
+    with _modules_lock:
+        module = _modules.get(key)
+        if module is None:
+            module = _modules[key] = _import_module(parser, key, directory, max_bytes)
+    return module
+
+def _import_module(parser, key, directory, max_bytes):
+    directory = directory or default_cache_dir()
+    name = MODULE_PREFIX + key
+    path = os.path.join(directory, name + '.py')
+    if os.path.exists(path):
+        # Mark as recently used for the LRU eviction
+        os.utime(path)
+    else:
+        os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.write(generate_source(parser))
+        os.replace(temporary, path)
+        GrammarCache(directory, max_bytes).evict(keep=path)
+
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def _throughput(parse, sentences):
+    tokens = sum(len(sentence) for sentence in sentences)
+    started = time.perf_counter()
+    accepted = sum(1 for sentence in sentences if parse(sentence))
+    return tokens / (time.perf_counter() - started), accepted
+
+def main():
+    from grammar_ir import GrammarIR
+    from pipeline import build_parser
+
+    grammar = GrammarIR.from_text('''
+    E -> E+T | T
+    T -> T*F | F
+    F -> (E) | i
+    ''')
+    grammar, _, parser = build_parser(grammar)
+    cfg = CFG(grammar.to_dict(), grammar.symbols.names[grammar.start])
+    cfg.calculate_first()
+    cfg.calculate_follow()
+    module = load_parser_module(parser)
+    print(f"generated module: {module.__file__}")
+
+    rng = random.Random(0)
+
+    def expression(depth=0):
+        if depth > 8 or rng.random() < 0.3:
+            return 'i'
+        choice = rng.random()
+        if choice < 0.4:
+            return expression(depth + 1) + '+' + expression(depth + 1)
+        if choice < 0.8:
+            return expression(depth + 1) + '*' + expression(depth + 1)
+        return '(' + expression(depth + 1) + ')'
+
+    sentences = [expression() for _ in range(20000)]
+    sentences += [s[:-1] for s in sentences[:5000]]
+    rng.shuffle(sentences)
+
+    # CFG.parse rebuilds its dict table on every call, so it gets a sample
+    baseline, _ = _throughput(cfg.parse, sentences[:500])
+    print(f"{'CFG.parse':>16}: {baseline:>12,.0f} tokens/s")
+    for label, parse in [('compiled table', parser.parse), ('generated module', module.parse)]:
+        rate, accepted = _throughput(parse, sentences)
+        print(f"{label:>16}: {rate:>12,.0f} tokens/s, x{rate / baseline:,.1f} "
+              f"({accepted}/{len(sentences)} accepted)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import sys
+
+from elimination_left_recur import eliminate_left_recursion_ir
+from grammar_analysis import GrammarAnalysis
+from grammar_ir import GrammarIR
+from grammar_loader import load_grammar
+from grammar_simplify import simplify
+from left_factor import left_factor_ir
+from ll1_parser import CompiledParser
+
+def build_parser(grammar, strict=False):
+    """Simplification -> left factoring -> left-recursion removal -> FIRST/FOLLOW -> table, all on the IR.
+
+    Unit productions are kept: inlining them ahead of left-recursion removal
+    can turn an LL(1)-able grammar into one with FIRST/FIRST conflicts.
+    Returns (transformed GrammarIR, GrammarAnalysis, CompiledParser); the
+    parser's conflicts are those left after the transformations, and with
+    strict the first of them raises LL1ConflictError.
+    """
+    grammar = simplify(grammar, units=False)
+    grammar = left_factor_ir(grammar)
+    grammar = eliminate_left_recursion_ir(grammar)
+    analysis = GrammarAnalysis.from_ir(grammar).compute_follow()
+    return grammar, analysis, CompiledParser.from_ir(grammar, analysis, strict)
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else 'grammar.txt'
+    grammar = load_grammar(path, terminals=('id',), validate=False)
+
+    grammar, analysis, parser = build_parser(grammar)
+    print(grammar.to_text())
+    for conflict in parser.conflicts:
+        print(f"Warning: {conflict}")
+    print()
+    first_sets = analysis.first_sets()
+    follow_sets = analysis.follow_sets()
+    for nt in analysis.non_terminals:
+        print(f"{nt}: FIRST {sorted(first_sets[nt])}  FOLLOW {sorted(follow_sets[nt])}")
+    print()
+    for tokens in (['id', '+', 'id', '*', 'id'], ['id', '+', '*']):
+        print(f"{' '.join(tokens)}: {parser.parse(tokens)}")
+
+    # Grammars that are LL(1) already must stay LL(1): strict raises otherwise
+    print()
+    for text, tokens in (("E -> TE'\nE' -> +TE' | ε\nT -> id", ['id', '+', 'id']),
+                         ("S -> AB\nA -> aA | ε\nB -> b", ['a', 'a', 'b'])):
+        _, _, parser = build_parser(GrammarIR.from_text(text, terminals=('id',)), strict=True)
+        print(f"{' '.join(tokens)}: {parser.parse(tokens)}")
+
+if __name__ == "__main__":
+    main()